@@ -4,6 +4,51 @@ import os
 import threading
 import time
 
+# 十二平均律音符表：覆盖 winsound.Beep 的有效范围 37-32767Hz，频率取最接近的整数Hz
+NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+# 原来C4到B5的音符表，保留这些值使该范围内生成的代码不变
+CLASSIC_NOTE_FREQS = {
+    'C4': 261, 'C#4': 277, 'D4': 293, 'D#4': 311, 'E4': 329, 'F4': 349,
+    'F#4': 370, 'G4': 392, 'G#4': 415, 'A4': 440, 'A#4': 466, 'B4': 493,
+    'C5': 523, 'C#5': 554, 'D5': 587, 'D#5': 622, 'E5': 659, 'F5': 698,
+    'F#5': 740, 'G5': 783, 'G#5': 831, 'A5': 880, 'A#5': 932, 'B5': 987,
+}
+
+
+def build_note_table(fmin=37, fmax=32767):
+    """返回 (音符名列表, 升序的频率数组)，只在模块加载时计算一次"""
+    midi = np.arange(12, 144)
+    freqs = np.round(440 * 2.0 ** ((midi - 69) / 12)).astype(int)
+    keep = (freqs >= fmin) & (freqs <= fmax)
+    names = [f"{NOTE_NAMES[m % 12]}{m // 12 - 1}" for m in midi[keep]]
+    freqs = np.array([CLASSIC_NOTE_FREQS.get(name, freq) for name, freq in zip(names, freqs[keep])])
+    return names, freqs
+
+
+NOTE_TABLE_NAMES, NOTE_TABLE_FREQS = build_note_table()
+NOTE_TABLE_INDEX = {name: i for i, name in enumerate(NOTE_TABLE_NAMES)}
+
+
+def quantize_to_notes(freqs):
+    """把所有帧的频率一次性量化为最接近的音符下标，距离相同时取较低的音(与逐帧 min(..., key=abs差) 相同)
+
+    本脚本不依赖其他文件，因此与 main4.1/pitch.py 的 nearest_notes 各保留一份，取舍规则需保持一致。
+    """
+    freqs = np.asarray(freqs, dtype=np.float64)
+    upper = np.clip(np.searchsorted(NOTE_TABLE_FREQS, freqs), 1, len(NOTE_TABLE_FREQS) - 1)
+    lower = upper - 1
+    use_upper = np.abs(NOTE_TABLE_FREQS[upper] - freqs) < np.abs(freqs - NOTE_TABLE_FREQS[lower])
+    return np.where(use_upper, upper, lower)
+
+
+def note_variable(index):
+    """生成代码中音符常量的变量名(按音符表下标，A-Z循环并加数字后缀)"""
+    name = chr(65 + index % 26)
+    if index >= 26:
+        name += str(index // 26)
+    return name
+
+
 def mp3_to_winsound(mp3_file, output_file=None, function_name=None):
     """
     将MP3文件转换为使用winsound.beep播放的Python代码
@@ -30,36 +75,8 @@ def mp3_to_winsound(mp3_file, output_file=None, function_name=None):
     # 使用librosa的音高检测
     pitches, magnitudes = librosa.piptrack(y=y, sr=sr)
     
-    # 定义音符频率映射（C4到B5）
-    note_freqs = {
-        'C4': 261,  # Do
-        'C#4': 277,
-        'D4': 293,  # Re
-        'D#4': 311,
-        'E4': 329,  # Mi
-        'F4': 349,  # Fa
-        'F#4': 370,
-        'G4': 392,  # So
-        'G#4': 415,
-        'A4': 440,  # La
-        'A#4': 466,
-        'B4': 493,  # Ti
-        'C5': 523,  # Do (高八度)
-        'C#5': 554,
-        'D5': 587,  # Re (高八度)
-        'D#5': 622,
-        'E5': 659,  # Mi (高八度)
-        'F5': 698,  # Fa (高八度)
-        'F#5': 740,
-        'G5': 783,  # So (高八度)
-        'G#5': 831,
-        'A5': 880,  # La (高八度)
-        'A#5': 932,
-        'B5': 987,  # Ti (高八度)
-    }
-    
-    # 反向映射，用于查找最接近的音符
-    freq_to_note = {freq: note for note, freq in note_freqs.items()}
+    # 音符频率映射(37-32767Hz 的十二平均律，见 NOTE_TABLE_NAMES/NOTE_TABLE_FREQS)
+    note_freqs = dict(zip(NOTE_TABLE_NAMES, NOTE_TABLE_FREQS.tolist()))
     
     # 分析每个时间帧的主要频率
     hop_length = 512
@@ -74,13 +91,16 @@ def mp3_to_winsound(mp3_file, output_file=None, function_name=None):
     # 设置幅度阈值，忽略低于此值的音符
     magnitude_threshold = np.max(magnitudes) * 0.1
     
+    # 一次性取出所有帧幅度最大的频率并量化到音符表
+    frame_idx = np.arange(pitches.shape[1])
+    max_magnitude_idx = np.argmax(magnitudes, axis=0)
+    max_magnitudes = magnitudes[max_magnitude_idx, frame_idx]
+    frame_pitches = pitches[max_magnitude_idx, frame_idx]
+    frame_notes = quantize_to_notes(frame_pitches)
+    
     for t, time_frame in enumerate(time_frames):
-        # 获取当前时间帧的最大幅度频率
-        max_magnitude_idx = np.argmax(magnitudes[:, t])
-        max_magnitude = magnitudes[max_magnitude_idx, t]
-        
         # 如果幅度太低，认为是静音
-        if max_magnitude < magnitude_threshold:
+        if max_magnitudes[t] < magnitude_threshold:
             if current_note is not None:
                 # 结束当前音符
                 duration = time_frame - start_time
@@ -90,14 +110,12 @@ def mp3_to_winsound(mp3_file, output_file=None, function_name=None):
                 current_note = None
             continue
         
-        # 获取频率并找到最接近的音符
-        freq = pitches[max_magnitude_idx, t]
-        if freq == 0:
+        # 音高为0的帧没有检测到音高
+        if frame_pitches[t] == 0:
             continue
         
-        # 找到最接近的标准音符频率
-        closest_freq = min(note_freqs.values(), key=lambda x: abs(x - freq))
-        note = [n for n, f in note_freqs.items() if f == closest_freq][0]
+        # 最接近的标准音符(已在循环前批量量化)
+        note = NOTE_TABLE_NAMES[frame_notes[t]]
         
         if current_note != note:
             # 如果有前一个音符，记录它的持续时间
@@ -125,13 +143,10 @@ def mp3_to_winsound(mp3_file, output_file=None, function_name=None):
         f.write("import winsound\n")
         f.write("from time import sleep\n\n")
         
-        # 写入音符频率常量
+        # 写入音符频率常量(只写用到的音符，变量名按音符表下标)
         f.write("# 音符频率定义\n")
-        for i, (note, freq) in enumerate(note_freqs.items()):
-            note_name = chr(65 + i % 26)  # A-Z循环
-            if i >= 26:
-                note_name += str(i // 26)
-            f.write(f"{note_name} = {freq}  # {note}\n")
+        for note in sorted(set(notes), key=NOTE_TABLE_INDEX.get):
+            f.write(f"{note_variable(NOTE_TABLE_INDEX[note])} = {note_freqs[note]}  # {note}\n")
         f.write("\n")
         
         # 写入函数定义
@@ -139,16 +154,8 @@ def mp3_to_winsound(mp3_file, output_file=None, function_name=None):
         
         # 写入音符序列
         for i, (note, duration) in enumerate(zip(notes, durations)):
-            # 获取音符对应的频率
-            freq = note_freqs[note]
-            
             # 找到对应的变量名
-            for j, (n, f) in enumerate(note_freqs.items()):
-                if n == note:
-                    note_var = chr(65 + j % 26)
-                    if j >= 26:
-                        note_var += str(j // 26)
-                    break
+            note_var = note_variable(NOTE_TABLE_INDEX[note])
             
             # 计算持续时间（毫秒）
             duration_ms = int(duration * 1000)
@@ -3,14 +3,175 @@ import numpy as np
 import os
 import threading
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk, scrolledtext
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import matplotlib
-import soundfile as sf  # 添加这一行导入soundfile
 matplotlib.use("TkAgg")
 
+# 十二平均律音符表：覆盖 winsound.Beep 的有效范围 37-32767Hz，频率取最接近的整数Hz
+NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+# 原来C4到B5的音符表，保留这些值使该范围内生成的代码不变
+CLASSIC_NOTE_FREQS = {
+    'C4': 261, 'C#4': 277, 'D4': 293, 'D#4': 311, 'E4': 329, 'F4': 349,
+    'F#4': 370, 'G4': 392, 'G#4': 415, 'A4': 440, 'A#4': 466, 'B4': 493,
+    'C5': 523, 'C#5': 554, 'D5': 587, 'D#5': 622, 'E5': 659, 'F5': 698,
+    'F#5': 740, 'G5': 783, 'G#5': 831, 'A5': 880, 'A#5': 932, 'B5': 987,
+}
+
+
+def build_note_table(fmin=37, fmax=32767):
+    """返回 (音符名列表, 升序的频率数组)，只在模块加载时计算一次"""
+    midi = np.arange(12, 144)
+    freqs = np.round(440 * 2.0 ** ((midi - 69) / 12)).astype(int)
+    keep = (freqs >= fmin) & (freqs <= fmax)
+    names = [f"{NOTE_NAMES[m % 12]}{m // 12 - 1}" for m in midi[keep]]
+    freqs = np.array([CLASSIC_NOTE_FREQS.get(name, freq) for name, freq in zip(names, freqs[keep])])
+    return names, freqs
+
+
+NOTE_TABLE_NAMES, NOTE_TABLE_FREQS = build_note_table()
+NOTE_TABLE_INDEX = {name: i for i, name in enumerate(NOTE_TABLE_NAMES)}
+
+
+def quantize_to_notes(freqs):
+    """把所有帧的频率一次性量化为最接近的音符下标，距离相同时取较低的音(与逐帧 min(..., key=abs差) 相同)
+
+    本脚本不依赖其他文件，因此与 main4.1/pitch.py 的 nearest_notes 各保留一份，取舍规则需保持一致。
+    """
+    freqs = np.asarray(freqs, dtype=np.float64)
+    upper = np.clip(np.searchsorted(NOTE_TABLE_FREQS, freqs), 1, len(NOTE_TABLE_FREQS) - 1)
+    lower = upper - 1
+    use_upper = np.abs(NOTE_TABLE_FREQS[upper] - freqs) < np.abs(freqs - NOTE_TABLE_FREQS[lower])
+    return np.where(use_upper, upper, lower)
+
+
+def note_variable(index):
+    """生成代码中音符常量的变量名(按音符表下标，A-Z循环并加数字后缀)"""
+    name = chr(65 + index % 26)
+    if index >= 26:
+        name += str(index // 26)
+    return name
+
+
+# 音符名 -> 频率(Hz)
+NOTE_FREQS = dict(zip(NOTE_TABLE_NAMES, NOTE_TABLE_FREQS.tolist()))
+
+
+def extract_note_sequence(pitches, magnitudes, sr, hop_length=512, on_frame=None):
+    """从 piptrack 的结果中提取音符序列，返回 (音符名列表, 持续时间列表)
+
+    on_frame(t, total) 每100帧调用一次，用于汇报进度。不依赖界面，可以在进程池中运行。
+    """
+    time_frames = librosa.frames_to_time(range(pitches.shape[1]), sr=sr, hop_length=hop_length)
+    
+    # 提取主要音符序列
+    notes = []
+    durations = []
+    current_note = None
+    start_time = 0
+    
+    # 设置幅度阈值，忽略低于此值的音符
+    magnitude_threshold = np.max(magnitudes) * 0.1
+    total_frames = len(time_frames)
+    
+    # 一次性取出所有帧幅度最大的频率并量化到音符表
+    frame_idx = np.arange(pitches.shape[1])
+    max_magnitude_idx = np.argmax(magnitudes, axis=0)
+    max_magnitudes = magnitudes[max_magnitude_idx, frame_idx]
+    frame_pitches = pitches[max_magnitude_idx, frame_idx]
+    frame_notes = quantize_to_notes(frame_pitches)
+    
+    for t, time_frame in enumerate(time_frames):
+        if on_frame is not None and t % 100 == 0:
+            on_frame(t, total_frames)
+        
+        # 如果幅度太低，认为是静音
+        if max_magnitudes[t] < magnitude_threshold:
+            if current_note is not None:
+                # 结束当前音符
+                duration = time_frame - start_time
+                if duration > 0.05:  # 忽略太短的音符
+                    notes.append(current_note)
+                    durations.append(duration)
+                current_note = None
+            continue
+        
+        # 音高为0的帧没有检测到音高
+        if frame_pitches[t] == 0:
+            continue
+        
+        # 最接近的标准音符(已在循环前批量量化)
+        note = NOTE_TABLE_NAMES[frame_notes[t]]
+        
+        if current_note != note:
+            # 如果有前一个音符，记录它的持续时间
+            if current_note is not None:
+                duration = time_frame - start_time
+                if duration > 0.05:  # 忽略太短的音符
+                    notes.append(current_note)
+                    durations.append(duration)
+            
+            # 开始新音符
+            current_note = note
+            start_time = time_frame
+    
+    # 处理最后一个音符
+    if current_note is not None:
+        duration = time_frames[-1] - start_time
+        if duration > 0.05:
+            notes.append(current_note)
+            durations.append(duration)
+    
+    return notes, durations
+
+
+def analyze_voice(shm_name, shape, dtype, index, sr):
+    """进程池任务：从共享内存中的幅度谱 (声部, 频率, 帧) 取出第 index 个声部并提取音符序列
+
+    直接映射主进程创建的共享内存，不复制频谱、不写临时文件，返回 (音符名列表, 持续时间列表)。
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        spectrograms = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        pitches, magnitudes = librosa.piptrack(S=spectrograms[index], sr=sr)
+        # 关闭共享内存前释放对缓冲区的引用
+        del spectrograms
+        return extract_note_sequence(pitches, magnitudes, sr)
+    finally:
+        shm.close()
+
+
+def note_constant_lines(notes):
+    """音符频率常量定义(只包含用到的音符，变量名按音符表下标)"""
+    lines = ["# 音符频率定义"]
+    for note in sorted(set(notes), key=NOTE_TABLE_INDEX.get):
+        lines.append(f"{note_variable(NOTE_TABLE_INDEX[note])} = {NOTE_FREQS[note]}  # {note}")
+    return lines
+
+
+def voice_function_lines(function_name, notes, durations):
+    """一个声部的播放函数"""
+    lines = [f"def {function_name}():"]
+    for i, (note, duration) in enumerate(zip(notes, durations)):
+        # 每10个音符添加一个分隔注释
+        if i % 10 == 0 and i > 0:
+            lines.append("    #-------------------------")
+        
+        # 写入winsound.Beep调用，持续时间为毫秒
+        lines.append(f"    winsound.Beep({note_variable(NOTE_TABLE_INDEX[note])},{int(duration * 1000)})  # {note}")
+        
+        # 如果音符之间有间隔，添加sleep
+        if i < len(notes) - 1 and duration < 0.2:
+            lines.append(f"    sleep({duration:.2f})")
+    if not notes:
+        lines.append("    pass")
+    return lines
+
+
 class MP3ToWinsoundApp(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -214,180 +375,59 @@ class MP3ToWinsoundApp(tk.Tk):
         pitches, magnitudes = librosa.piptrack(y=y, sr=sr)
         self.log(f"频率分析完成，检测到 {pitches.shape[1]} 个时间帧")
         
-        # 定义音符频率映射（C4到B5）
-        note_freqs = {
-            'C4': 261,  # Do
-            'C#4': 277,
-            'D4': 293,  # Re
-            'D#4': 311,
-            'E4': 329,  # Mi
-            'F4': 349,  # Fa
-            'F#4': 370,
-            'G4': 392,  # So
-            'G#4': 415,
-            'A4': 440,  # La
-            'A#4': 466,
-            'B4': 493,  # Ti
-            'C5': 523,  # Do (高八度)
-            'C#5': 554,
-            'D5': 587,  # Re (高八度)
-            'D#5': 622,
-            'E5': 659,  # Mi (高八度)
-            'F5': 698,  # Fa (高八度)
-            'F#5': 740,
-            'G5': 783,  # So (高八度)
-            'G#5': 831,
-            'A5': 880,  # La (高八度)
-            'A#5': 932,
-            'B5': 987,  # Ti (高八度)
-        }
+        notes, durations, note_freqs = self.extract_notes(pitches, magnitudes, sr)
         
-        self.log("音符频率映射表已创建")
+        # 可视化提取的音符
+        self.visualize_notes(notes, durations, note_freqs)
+        
+        self.write_winsound_code(output_file, function_name, notes, durations, note_freqs, mp3_file)
+        return output_file
+    
+    def extract_notes(self, pitches, magnitudes, sr):
+        """从 piptrack 的结果中提取音符序列，返回 (音符名列表, 持续时间列表, 音符频率映射)"""
+        # 音符频率映射(37-32767Hz 的十二平均律，见 NOTE_TABLE_NAMES/NOTE_TABLE_FREQS)
+        note_freqs = NOTE_FREQS
         
-        # 反向映射，用于查找最接近的音符
-        freq_to_note = {freq: note for note, freq in note_freqs.items()}
+        self.log(f"音符频率映射表已创建({len(note_freqs)} 个音符)")
         
         # 分析每个时间帧的主要频率
         self.log("正在提取主要音符序列...")
         self.progress_var.set(30)
-        hop_length = 512
-        time_frames = librosa.frames_to_time(range(pitches.shape[1]), sr=sr, hop_length=hop_length)
-        
-        # 提取主要音符序列
-        notes = []
-        durations = []
-        current_note = None
-        start_time = 0
-        
-        # 设置幅度阈值，忽略低于此值的音符
-        magnitude_threshold = np.max(magnitudes) * 0.1
-        self.log(f"设置幅度阈值: {magnitude_threshold:.2f}")
+        self.log(f"设置幅度阈值: {np.max(magnitudes) * 0.1:.2f}")
+        self.log(f"开始处理 {pitches.shape[1]} 个时间帧...")
         
-        total_frames = len(time_frames)
-        self.log(f"开始处理 {total_frames} 个时间帧...")
-        
-        for t, time_frame in enumerate(time_frames):
+        def on_frame(t, total_frames):
             # 更新进度条
-            if t % 100 == 0:
-                progress = 30 + (t / total_frames) * 40
-                self.progress_var.set(progress)
-                if t % 1000 == 0:
-                    self.log(f"已处理 {t}/{total_frames} 帧 ({t/total_frames*100:.1f}%)")
-            
-            # 获取当前时间帧的最大幅度频率
-            max_magnitude_idx = np.argmax(magnitudes[:, t])
-            max_magnitude = magnitudes[max_magnitude_idx, t]
-            
-            # 如果幅度太低，认为是静音
-            if max_magnitude < magnitude_threshold:
-                if current_note is not None:
-                    # 结束当前音符
-                    duration = time_frame - start_time
-                    if duration > 0.05:  # 忽略太短的音符
-                        notes.append(current_note)
-                        durations.append(duration)
-                    current_note = None
-                continue
-            
-            # 获取频率并找到最接近的音符
-            freq = pitches[max_magnitude_idx, t]
-            if freq == 0:
-                continue
-            
-            # 找到最接近的标准音符频率
-            closest_freq = min(note_freqs.values(), key=lambda x: abs(x - freq))
-            note = [n for n, freq_val in note_freqs.items() if freq_val == closest_freq][0]
-            
-            if current_note != note:
-                # 如果有前一个音符，记录它的持续时间
-                if current_note is not None:
-                    duration = time_frame - start_time
-                    if duration > 0.05:  # 忽略太短的音符
-                        notes.append(current_note)
-                        durations.append(duration)
-                
-                # 开始新音符
-                current_note = note
-                start_time = time_frame
-        
-        # 处理最后一个音符
-        if current_note is not None:
-            duration = time_frames[-1] - start_time
-            if duration > 0.05:
-                notes.append(current_note)
-                durations.append(duration)
-        
-        self.log(f"音符提取完成，共提取出 {len(notes)} 个音符")
+            self.progress_var.set(30 + (t / total_frames) * 40)
+            if t % 1000 == 0:
+                self.log(f"已处理 {t}/{total_frames} 帧 ({t/total_frames*100:.1f}%)")
         
-        # 可视化提取的音符
-        self.visualize_notes(notes, durations, note_freqs)
+        notes, durations = extract_note_sequence(pitches, magnitudes, sr, on_frame=on_frame)
         
+        self.log(f"音符提取完成，共提取出 {len(notes)} 个音符")
+        return notes, durations, note_freqs
+    
+    def write_winsound_code(self, output_file, function_name, notes, durations, note_freqs, source_file):
+        """把音符序列写成 winsound.Beep 播放代码"""
         # 生成Python代码
         self.log(f"正在生成Python代码到: {output_file}")
         self.progress_var.set(80)
+        lines = ["import winsound", "from time import sleep", ""]
+        lines += note_constant_lines(notes) + [""]
+        lines += voice_function_lines(function_name, notes, durations)
+        # 写入主程序调用
+        lines += [
+            "",
+            "if __name__ == '__main__':",
+            f"    print('正在播放: {os.path.basename(source_file)}')",
+            f"    {function_name}()",
+            "    print('播放完成')",
+        ]
         with open(output_file, 'w', encoding='utf-8') as f:
-            # 写入导入语句
-            f.write("import winsound\n")
-            f.write("from time import sleep\n\n")
-            # 在mp3_to_winsound方法中，第332-338行已经有正确的逻辑
-            # 写入音符频率常量
-            f.write("# 音符频率定义\n")
-            for i, (note, freq) in enumerate(note_freqs.items()):
-                note_name = chr(65 + i % 26)  # A-Z循环
-                if i >= 26:
-                    note_name += str(i // 26)
-                f.write(f"{note_name} = {freq}  # {note}\n")
-            f.write("\n")
-            
-            # 写入函数定义
-            f.write(f"def {function_name}():\n")
-            
-            # 写入音符序列
-            for i, (note, duration) in enumerate(zip(notes, durations)):
-                # 获取音符对应的频率
-                freq = note_freqs[note]
-                
-                # 找到对应的变量名
-                note_var = None  # 初始化变量
-                for j, (n, freq_val) in enumerate(note_freqs.items()):
-                    if n == note:
-                        note_var = chr(65 + j % 26)
-                        if j >= 26:
-                            note_var += str(j // 26)
-                        break
-                
-                # 调试输出
-                print(f"Debug: note={note}, note_var={note_var}, type={type(note_var)}")
-                
-                # 计算持续时间（毫秒）
-                duration_ms = int(duration * 1000)
-                
-                # 每10个音符添加一个分隔注释
-                if i % 10 == 0 and i > 0:
-                    f.write(f"    #-------------------------\n")
-                
-                # 确保note_var是有效的字符串变量名
-                if note_var is None or not isinstance(note_var, str):
-                    # 使用频率值代替变量名
-                    f.write(f"    winsound.Beep({int(freq)},{duration_ms})  # {note}\n")
-                else:
-                    # 写入winsound.Beep调用，确保note_var是字符串
-                    f.write(f"    winsound.Beep({str(note_var)},{duration_ms})  # {note}\n")
-                
-                # 如果音符之间有间隔，添加sleep
-                if i < len(notes) - 1 and duration < 0.2:
-                    f.write(f"    sleep({duration:.2f})\n")
-            
-            # 写入主程序调用
-            f.write("\n")
-            f.write(f"if __name__ == '__main__':\n")
-            f.write(f"    print('正在播放: {os.path.basename(mp3_file)}')\n")
-            f.write(f"    {function_name}()\n")
-            f.write(f"    print('播放完成')\n")
+            f.write("\n".join(lines) + "\n")
         
         self.log(f"代码生成完成，共生成 {len(notes)} 个音符的播放代码")
         self.progress_var.set(100)
-        return output_file
     
     def play_mp3_with_threads(self, mp3_file, num_threads=2):
         """使用多线程分析MP3文件的不同频率范围并生成多个winsound函数"""
@@ -400,100 +440,80 @@ class MP3ToWinsoundApp(tk.Tk):
         # 可视化音频波形
         self.visualize_audio(y, sr)
         
-        # 将频率范围分成多个部分
+        # 只做一次STFT，直接在幅度谱上分离和声和打击乐部分，分离结果不再还原成音频
         self.log("正在分离和声和打击乐部分...")
         self.progress_var.set(20)
-        y_harmonic, y_percussive = librosa.effects.hpss(y)
+        S = np.abs(librosa.stft(y))
+        S_harmonic, S_percussive = librosa.decompose.hpss(S)
         self.log("音频分离完成")
         
-        # 可视化分离后的音频
-        self.visualize_separated_audio(y_harmonic, y_percussive, sr)
+        # 可视化分离后的两部分
+        self.visualize_separated_spectrograms(S_harmonic, S_percussive, sr)
         
-        # 创建输出文件
+        # 每个声部一个播放函数(最多为和声、打击乐两个声部)
         base_name = os.path.splitext(os.path.basename(mp3_file))[0]
         output_file = f"{os.path.splitext(mp3_file)[0]}_multi_thread.py"
+        voices = [("harmonic", "和声", S_harmonic), ("percussive", "打击乐", S_percussive)][:max(1, num_threads)]
         
-        self.log(f"正在生成多线程Python代码到: {output_file}")
+        # 所有声部的幅度谱放进一块共享内存，进程池中的各进程直接映射读取并行提取音符，不写临时文件
+        self.log(f"正在并行提取 {len(voices)} 个声部的音符...")
         self.progress_var.set(30)
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            # 写入导入语句
-            f.write("import winsound\n")
-            f.write("from time import sleep\n")
-            f.write("import threading\n\n")
-            
-            # 为每个线程生成一个函数
-            for i in range(num_threads):
-                if i == 0:
-                    # 第一个线程处理和声部分
-                    audio_part = y_harmonic
-                    part_name = "harmonic"
-                    self.log("正在处理和声部分...")
-                else:
-                    # 第二个线程处理打击乐部分
-                    audio_part = y_percussive
-                    part_name = "percussive"
-                    self.log("正在处理打击乐部分...")
-                
-                # 生成临时文件
-                temp_file = f"{os.path.splitext(mp3_file)[0]}_{part_name}_temp.wav"
-                self.log(f"正在生成临时文件: {temp_file}")
-                sf.write(temp_file, audio_part, sr)
-                
-                # 更新进度
-                progress = 30 + (i / num_threads) * 50
-                self.progress_var.set(progress)
-                
-                # 转换这部分音频并获取生成的代码
-                temp_output = f"{os.path.splitext(mp3_file)[0]}_{part_name}_temp.py"
-                self.log(f"正在为{part_name}部分生成代码: {temp_output}")
-                self.mp3_to_winsound(temp_file, temp_output, f"{base_name}_{part_name}")
-                
-                # 读取生成的代码并合并
-                with open(temp_output, 'r', encoding='utf-8') as temp_f:
-                    code = temp_f.read()
-                    # 提取函数定义部分
-                    function_start = code.find(f"def {base_name}_{part_name}()")
-                    function_end = code.find("if __name__ == '__main__':")
-                    if function_end == -1:
-                        function_end = len(code)
-                    function_code = code[function_start:function_end].strip()
-                    
-                    # 写入函数定义
-                    f.write(function_code + "\n\n")
-                
-                # 删除临时文件
-                try:
-                    os.remove(temp_file)
-                    os.remove(temp_output)
-                    self.log(f"临时文件已删除: {temp_file}, {temp_output}")
-                except Exception as e:
-                    self.log(f"删除临时文件时出错: {str(e)}")
-            
-            # 写入主函数，使用线程并行播放
-            f.write("def play_all():\n")
-            f.write("    threads = []\n")
-            for i in range(num_threads):
-                if i == 0:
-                    part_name = "harmonic"
-                else:
-                    part_name = "percussive"
-                f.write(f"    t{i} = threading.Thread(target={base_name}_{part_name})\n")
-                f.write(f"    threads.append(t{i})\n")
-            
-            f.write("\n    # 启动所有线程\n")
-            f.write("    for t in threads:\n")
-            f.write("        t.start()\n")
-            
-            f.write("\n    # 等待所有线程完成\n")
-            f.write("    for t in threads:\n")
-            f.write("        t.join()\n")
+        shape = (len(voices),) + S_harmonic.shape
+        dtype = np.dtype(np.float32)
+        shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * dtype.itemsize)
+        try:
+            spectrograms = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+            np.stack([S_part for _, _, S_part in voices], out=spectrograms)
+            del spectrograms
             
-            # 写入主程序调用
-            f.write("\nif __name__ == '__main__':\n")
-            f.write(f"    print('正在多线程播放: {os.path.basename(mp3_file)}')\n")
-            f.write(f"    play_all()\n")
-            f.write(f"    print('播放完成')\n")
+            results = [None] * len(voices)
+            with ProcessPoolExecutor(max_workers=len(voices)) as executor:
+                futures = {
+                    executor.submit(analyze_voice, shm.name, shape, dtype.str, i, sr): i
+                    for i in range(len(voices))
+                }
+                for done, future in enumerate(as_completed(futures), 1):
+                    i = futures[future]
+                    results[i] = future.result()
+                    self.log(f"{voices[i][1]}部分完成，共 {len(results[i][0])} 个音符")
+                    self.progress_var.set(30 + done / len(voices) * 50)
+        finally:
+            shm.close()
+            shm.unlink()
+        
+        # 在界面线程中绘制各声部的音符
+        voice_notes = [(label, notes, durations) for (_, label, _), (notes, durations) in zip(voices, results)]
+        self.after(0, self.visualize_voice_notes, voice_notes)
+        
+        # 由各声部的音符序列直接拼出完整代码：公共的音符常量、每个声部一个函数、并行播放的 play_all
+        self.log(f"正在生成多线程Python代码到: {output_file}")
+        function_names = [f"{base_name}_{part_name}" for part_name, _, _ in voices]
+        all_notes = [note for notes, _ in results for note in notes]
+        lines = ["import winsound", "from time import sleep", "import threading", ""]
+        lines += note_constant_lines(all_notes) + [""]
+        for function_name, (notes, durations) in zip(function_names, results):
+            lines += voice_function_lines(function_name, notes, durations) + ["", ""]
+        lines += ["def play_all():", "    threads = []"]
+        for i, function_name in enumerate(function_names):
+            lines.append(f"    t{i} = threading.Thread(target={function_name})")
+            lines.append(f"    threads.append(t{i})")
+        lines += [
+            "",
+            "    # 启动所有线程",
+            "    for t in threads:",
+            "        t.start()",
+            "",
+            "    # 等待所有线程完成",
+            "    for t in threads:",
+            "        t.join()",
+            "",
+            "if __name__ == '__main__':",
+            f"    print('正在多线程播放: {os.path.basename(mp3_file)}')",
+            "    play_all()",
+            "    print('播放完成')",
+        ]
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
         
         self.log(f"多线程代码生成完成: {output_file}")
         self.progress_var.set(100)
@@ -511,22 +531,17 @@ class MP3ToWinsoundApp(tk.Tk):
         except Exception as e:
             self.log(f"可视化音频波形时出错: {str(e)}")
     
-    def visualize_separated_audio(self, y_harmonic, y_percussive, sr):
-        """可视化分离后的音频"""
+    def visualize_separated_spectrograms(self, S_harmonic, S_percussive, sr, hop_length=512):
+        """可视化分离后的两部分：每帧的能量随时间的变化"""
         try:
             self.ax.clear()
-            plt.subplot(211)
-            librosa.display.waveshow(y_harmonic, sr=sr, alpha=0.5, ax=self.ax)
-            self.ax.set_title("和声部分")
-            self.ax.set_ylabel("振幅")
-            
-            plt.subplot(212)
-            librosa.display.waveshow(y_percussive, sr=sr, color='r', alpha=0.5)
-            plt.title("打击乐部分")
-            plt.xlabel("时间 (秒)")
-            plt.ylabel("振幅")
-            plt.tight_layout()
-            
+            times = librosa.frames_to_time(np.arange(S_harmonic.shape[1]), sr=sr, hop_length=hop_length)
+            self.ax.plot(times, np.sum(S_harmonic ** 2, axis=0), label="和声部分", alpha=0.7)
+            self.ax.plot(times, np.sum(S_percussive ** 2, axis=0), 'r', label="打击乐部分", alpha=0.7)
+            self.ax.set_title("和声/打击乐分离")
+            self.ax.set_xlabel("时间 (秒)")
+            self.ax.set_ylabel("能量")
+            self.ax.legend()
             self.canvas.draw()
         except Exception as e:
             self.log(f"可视化分离音频时出错: {str(e)}")
@@ -557,6 +572,33 @@ class MP3ToWinsoundApp(tk.Tk):
         except Exception as e:
             self.log(f"可视化音符时出错: {str(e)}")
 
+    def visualize_voice_notes(self, voice_notes):
+        """在同一张图上可视化各声部提取的音符，voice_notes 为 [(声部名, 音符列表, 持续时间列表), ...]"""
+        try:
+            self.ax.clear()
+            
+            colors = ['b', 'r', 'g', 'm']
+            total = 0
+            for (label, notes, durations), color in zip(voice_notes, colors):
+                # 计算每个音符的开始时间
+                start_times = np.concatenate(([0], np.cumsum(durations)[:-1])) if durations else []
+                for note, duration, start_time in zip(notes, durations, start_times):
+                    freq = NOTE_FREQS[note]
+                    self.ax.plot([start_time, start_time + duration], [freq, freq], f'{color}-', linewidth=2)
+                # 图例只需每个声部一条
+                self.ax.plot([], [], f'{color}-', linewidth=2, label=f"{label} ({len(notes)}个音符)")
+                total += len(notes)
+            
+            self.ax.set_title(f"各声部提取的音符序列 (共{total}个音符)")
+            self.ax.set_xlabel("时间 (秒)")
+            self.ax.set_ylabel("频率 (Hz)")
+            self.ax.grid(True)
+            self.ax.legend()
+            
+            self.canvas.draw()
+        except Exception as e:
+            self.log(f"可视化音符时出错: {str(e)}")
+
 def main():
     app = MP3ToWinsoundApp()
     app.mainloop()
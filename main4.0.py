@@ -409,23 +409,30 @@ class MP3ToWinsoundApp(tk.Tk):
             self.progress_var.set(90)
             self.log("生成Python代码...")
             
+            # 合并相邻的相同调用
+            calls = self.coalesce_calls(processed_freqs, processed_durations)
+            if processed_freqs:
+                self.log(f"合并相邻的相同调用: {len(processed_freqs)} → {len(calls)} 次，"
+                         f"减少 {(len(processed_freqs) - len(calls)) / len(processed_freqs):.1%}")
+            
             # 生成代码
             with open(output_file, 'w', encoding='utf-8') as f:
                 f.write(f"# 由MP3文件 '{mp3_file}' 自动生成的winsound.beep播放代码\n")
                 f.write(f"# 生成时间: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
                 f.write(f"# 音频信息: 采样率 {sr} Hz, 时长 {len(y)/sr:.2f} 秒\n")
-                f.write(f"# 音调数量: {len(processed_freqs)}\n\n")
+                f.write(f"# 音调数量: {len(processed_freqs)}\n")
+                f.write(f"# 播放调用: {len(calls)} 次(合并相邻的相同调用前 {len(processed_freqs)} 次)\n\n")
                 f.write("import winsound\n")
                 f.write("import time\n\n")
                 f.write(f"def {function_name}():\n")
                 f.write('    """播放转换后的音频"""\n')
                 f.write("    print('开始播放音频...')\n")
                 
-                for i, (freq, duration) in enumerate(zip(processed_freqs, processed_durations)):
+                for freq, duration_ms in calls:
                     if freq == 0:  # sleep
-                        f.write(f"    time.sleep({duration:.3f})  # 静音段\n")
+                        f.write(f"    time.sleep({duration_ms / 1000:.3f})  # 静音段\n")
                     else:
-                        f.write(f"    winsound.Beep({freq}, {int(duration * 1000)})\n")
+                        f.write(f"    winsound.Beep({freq}, {duration_ms})\n")
                 
                 f.write("    print('播放完成！')\n\n")
                 f.write(f"if __name__ == '__main__':\n")
@@ -527,6 +534,27 @@ class MP3ToWinsoundApp(tk.Tk):
         
         return processed_freqs, processed_durations
     
+    def coalesce_calls(self, frequencies, durations):
+        """把音调段转换为 (频率, 毫秒) 调用列表，并合并相邻的相同 Beep 和相邻的 sleep(频率为0)
+        
+        先把频率限制在winsound.Beep的有效范围 37-32767Hz 内、持续时间取整为毫秒，再合并，
+        因此每段的毫秒数与不合并时相同，总时长不变。
+        """
+        calls = []
+        for freq, duration in zip(frequencies, durations):
+            if freq == 0:
+                duration_ms = round(duration * 1000)
+            else:
+                freq = max(37, min(32767, int(freq)))
+                duration_ms = int(duration * 1000)
+            
+            if calls and calls[-1][0] == freq:
+                calls[-1][1] += duration_ms
+            else:
+                calls.append([freq, duration_ms])
+        
+        return calls
+    
     def visualize_audio(self, frequencies, durations):
         """可视化音频频率和持续时间"""
         self.ax.clear()
@@ -0,0 +1,106 @@
+import numpy as np
+
+# 人耳可听范围
+MIN_AUDIBLE_FREQ = 20
+MAX_AUDIBLE_FREQ = 20000
+# 范围内没有可用频率时的默认值(A4)
+DEFAULT_FREQ = 440.0
+
+
+def dominant_frequencies(magnitude, freqs, fmin=MIN_AUDIBLE_FREQ, fmax=MAX_AUDIBLE_FREQ):
+    """对整个幅度矩阵一次性求出每帧在[fmin, fmax]内幅度最大的频率
+
+    magnitude 形状为 (频率, 帧)，freqs 为对应的频率轴(升序)。
+    返回长度为帧数的 NumPy 数组。
+    """
+    magnitude = np.asarray(magnitude)
+    freqs = np.asarray(freqs)
+
+    # 频率轴是升序的，范围内的频点是一段连续的切片，直接切片即可，无需逐帧掩码
+    lo = int(np.searchsorted(freqs, fmin, side='left'))
+    hi = int(np.searchsorted(freqs, fmax, side='right'))
+
+    if magnitude.shape[1] == 0:
+        return np.zeros(0, dtype=np.float64)
+    if hi <= lo:
+        return np.full(magnitude.shape[1], DEFAULT_FREQ, dtype=np.float64)
+
+    peak_idx = np.argmax(magnitude[lo:hi], axis=0) + lo
+    return freqs[peak_idx].astype(np.float64)
+
+
+def fixed_segment_frequencies(y, sr, fixed_duration, chunk_segments=256, on_chunk=None):
+    """把音频按固定时长切段，批量求每段的主要频率
+
+    信号被重塑为 (段数, 每段采样数) 的视图(不复制)，每次对 chunk_segments 段一起做 rfft，
+    内存占用与音频长度无关。末尾不足一段的部分单独计算，持续时间按实际长度。
+    每段只有1个采样时没有可用的频点，与旧实现一样使用 DEFAULT_FREQ。
+    on_chunk(已完成段数) 在每批计算完后调用。返回 (频率数组, 持续时间数组)。
+    """
+    y = np.asarray(y)
+    segment_length = int(round(fixed_duration * sr))
+    if segment_length <= 0:
+        return np.zeros(0, dtype=np.float64), np.zeros(0, dtype=np.float64)
+
+    num_segments = len(y) // segment_length
+    if segment_length < 2:
+        # 只有1个采样时去掉奈奎斯特频率后一个频点都不剩
+        if on_chunk is not None:
+            on_chunk(num_segments)
+        return np.full(num_segments, DEFAULT_FREQ, dtype=np.float64), np.full(num_segments, 1 / sr, dtype=np.float64)
+
+    segments = y[:num_segments * segment_length].reshape(num_segments, segment_length)
+    freqs = np.fft.rfftfreq(segment_length, 1 / sr)[:segment_length // 2]
+
+    peak_freqs = np.empty(num_segments, dtype=np.float64)
+    for start in range(0, num_segments, chunk_segments):
+        magnitude = np.abs(np.fft.rfft(segments[start:start + chunk_segments], axis=-1))
+        # 只取前一半频点(与旧实现一致，不含奈奎斯特频率)
+        peak_freqs[start:start + chunk_segments] = freqs[np.argmax(magnitude[:, :segment_length // 2], axis=-1)]
+        if on_chunk is not None:
+            on_chunk(min(start + chunk_segments, num_segments))
+    durations = np.full(num_segments, segment_length / sr, dtype=np.float64)
+
+    # 末尾不足一段的部分，短于1毫秒或只有1个采样(没有可用频点)的直接丢弃
+    tail = y[num_segments * segment_length:]
+    if len(tail) >= 2 and len(tail) / sr >= 0.001:
+        tail_freqs = np.fft.rfftfreq(len(tail), 1 / sr)[:len(tail) // 2]
+        tail_peak = tail_freqs[np.argmax(np.abs(np.fft.rfft(tail))[:len(tail) // 2])]
+        peak_freqs = np.append(peak_freqs, tail_peak)
+        durations = np.append(durations, len(tail) / sr)
+
+    # 限制频率范围，超出范围的使用默认值
+    in_range = (peak_freqs >= MIN_AUDIBLE_FREQ) & (peak_freqs <= MAX_AUDIBLE_FREQ)
+    return np.where(in_range, peak_freqs, DEFAULT_FREQ), durations
+
+
+def spectrogram_steps(n_rows, n_cols, max_rows=400, max_cols=1200):
+    """缩小到不超过 max_rows x max_cols 时，每块包含的 (频点数, 帧数)"""
+    return max(1, -(-n_rows // max_rows)), max(1, -(-n_cols // max_cols))
+
+
+def pool_spectrogram(magnitude, row_step, col_step):
+    """按 row_step x col_step 的块取最大值
+
+    取最大值而不是抽样，短促的音符和高频细节在缩小后仍然可见。
+    分块计算时只要每块的帧数是 col_step 的整数倍，拼接结果与整体计算相同。
+    """
+    magnitude = np.asarray(magnitude)
+    if magnitude.size == 0:
+        return magnitude
+    small = np.maximum.reduceat(magnitude, np.arange(0, magnitude.shape[0], row_step), axis=0)
+    return np.maximum.reduceat(small, np.arange(0, magnitude.shape[1], col_step), axis=1)
+
+
+def downsample_spectrogram(magnitude, freqs, times, max_rows=400, max_cols=1200):
+    """把幅度谱缩小到显示分辨率，返回 {'magnitude', 'freqs', 'times'}
+
+    freqs 和 times 为每个块第一个频点/帧的坐标，可直接传给 specshow。
+    """
+    magnitude = np.asarray(magnitude)
+    row_step, col_step = spectrogram_steps(*magnitude.shape, max_rows, max_cols)
+    return {
+        'magnitude': pool_spectrogram(magnitude, row_step, col_step),
+        'freqs': np.asarray(freqs)[::row_step],
+        'times': np.asarray(times)[::col_step],
+    }
@@ -0,0 +1,71 @@
+import numpy as np
+from scipy.signal import ZoomFFT, get_window
+
+from analysis import dominant_frequencies
+from presets import DEFAULT_BAND
+
+# Zoom FFT 在频带内的频点数
+ZOOM_BINS = 512
+
+
+def note_frequencies(fmin, fmax, a4=440.0):
+    """[fmin, fmax] 内的十二平均律音符频率(升序)"""
+    low = int(np.ceil(12 * np.log2(fmin / a4)))
+    high = int(np.floor(12 * np.log2(fmax / a4)))
+    return a4 * 2.0 ** (np.arange(low, high + 1) / 12)
+
+
+def frame_view(y, n_fft, hop_length):
+    """按 hop_length 取长度为 n_fft 的帧(不复制)，形状为 (帧数, n_fft)，与 librosa.stft(center=False) 的分帧相同"""
+    if len(y) < n_fft:
+        return np.zeros((0, n_fft), dtype=y.dtype)
+    return np.lib.stride_tricks.sliding_window_view(y, n_fft)[::hop_length]
+
+
+class BandAnalyzer:
+    """只计算 [fmin, fmax] 频带内频谱的分析器，变换矩阵在构造时准备好，之后逐块调用 magnitude
+
+    method='zoom': chirp-z 变换，在频带内均匀取 bins 个频点，频点间距不受 sr / n_fft 限制；
+    method='goertzel': 对频带内每个十二平均律音符做一次 Goertzel(单频点DFT)，
+    所有帧和音符合并为一次矩阵乘法，结果直接是音符频率；120秒输入约比完整STFT快一倍(0.08 对 0.16 秒)。
+    两者都使用与 librosa.stft 相同的 Hann 窗。zoom 比完整STFT慢约4倍，只在 benchmark.py 的提取器对比中使用。
+    """
+
+    def __init__(self, sr, n_fft, fmin=DEFAULT_BAND[0], fmax=DEFAULT_BAND[1], method='goertzel', bins=ZOOM_BINS):
+        if not 0 < fmin < fmax <= sr / 2:
+            raise ValueError(f"频带 {fmin:g}-{fmax:g}Hz 无效，应满足 0 < 下限 < 上限 <= {sr / 2:g}Hz")
+        self.sr = sr
+        self.n_fft = n_fft
+        self.method = method
+        self.window = get_window('hann', n_fft).astype(np.float32)
+        if method == 'zoom':
+            self.freqs = np.linspace(fmin, fmax, bins)
+            self._zoom = ZoomFFT(n_fft, [fmin, fmax], m=bins, fs=sr, endpoint=True)
+        elif method == 'goertzel':
+            self.freqs = note_frequencies(fmin, fmax)
+            if len(self.freqs) == 0:
+                raise ValueError(f"频带 {fmin:g}-{fmax:g}Hz 内没有音符")
+            # 加窗后的 cos/sin 基，实部和虚部拼成一个实矩阵，一次乘法算出所有音符
+            phase = 2 * np.pi * np.outer(np.arange(n_fft), self.freqs) / sr
+            self._basis = np.concatenate([np.cos(phase), np.sin(phase)], axis=1).astype(np.float32) * self.window[:, None]
+        else:
+            raise ValueError(f"未知的频带分析方法: {method}，可选: zoom, goertzel")
+
+    def magnitude(self, frames):
+        """frames 形状为 (帧数, n_fft)，返回频带内的幅度，形状为 (频点, 帧数)"""
+        if self.method == 'zoom':
+            return np.abs(self._zoom(frames * self.window)).T
+        parts = frames @ self._basis
+        n = len(self.freqs)
+        return np.hypot(parts[:, :n], parts[:, n:]).T
+
+
+def band_frequencies(y, sr, n_fft, hop_length, fmin=DEFAULT_BAND[0], fmax=DEFAULT_BAND[1], method='goertzel', chunk_frames=2048):
+    """对整段音频做频带分析，返回每帧在频带内幅度最大的频率(帧数与 librosa.stft(center=True) 相同)"""
+    analyzer = BandAnalyzer(sr, n_fft, fmin, fmax, method)
+    frames = frame_view(np.pad(y, n_fft // 2), n_fft, hop_length)
+    result = np.empty(len(frames), dtype=np.float64)
+    for start in range(0, len(frames), chunk_frames):
+        result[start:start + chunk_frames] = dominant_frequencies(
+            analyzer.magnitude(frames[start:start + chunk_frames]), analyzer.freqs, fmin, fmax)
+    return result
@@ -0,0 +1,139 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# 批量模式下从目录中收集的音频扩展名
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.flac', '.ogg')
+
+
+def collect_audio_files(paths):
+    """把文件和目录混合的列表展开为音频文件列表(目录递归查找，结果保持稳定顺序，同一文件只保留第一次出现)"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    if name.lower().endswith(AUDIO_EXTENSIONS):
+                        files.append(os.path.join(root, name))
+        else:
+            files.append(path)
+    return unique_files(files)
+
+
+def file_key(path):
+    """判断两个路径是否为同一文件的键(解析符号链接和 ..，Windows 上不区分大小写)"""
+    return os.path.normcase(os.path.realpath(path))
+
+
+def unique_files(paths):
+    """按实际路径去重，保持原有顺序"""
+    seen = set()
+    files = []
+    for path in paths:
+        key = file_key(path)
+        if key not in seen:
+            seen.add(key)
+            files.append(path)
+    return files
+
+
+def output_files(mp3_files):
+    """为每个输入决定输出文件，返回 {输入: 输出路径或None}
+
+    None 表示使用 WinsoundConverter.mp3_to_winsound 的默认输出(<输入文件名>_winsound.py)。
+    同一目录下只有扩展名不同的输入(例如 foo.mp3 和 foo.wav)默认输出相同，会互相覆盖，
+    这些输入改为在文件名中保留扩展名(foo_mp3_winsound.py、foo_wav_winsound.py)；
+    改名后仍然冲突时(例如还有 foo_mp3.wav)抛出 ValueError，不开始转换。
+    """
+    def default_output(mp3_file):
+        return os.path.splitext(mp3_file)[0] + "_winsound.py"
+
+    groups = {}
+    for mp3_file in mp3_files:
+        groups.setdefault(file_key(default_output(mp3_file)), []).append(mp3_file)
+    outputs = {}
+    for group in groups.values():
+        for mp3_file in group:
+            if len(group) == 1:
+                outputs[mp3_file] = None
+            else:
+                stem, extension = os.path.splitext(mp3_file)
+                outputs[mp3_file] = f"{stem}_{extension.lstrip('.').lower()}_winsound.py"
+
+    owners = {}
+    for mp3_file, output_file in outputs.items():
+        key = file_key(output_file or default_output(mp3_file))
+        if key in owners:
+            raise ValueError(f"'{owners[key]}' 和 '{mp3_file}' 的输出文件相同: {output_file or default_output(mp3_file)}")
+        owners[key] = mp3_file
+    return outputs
+
+
+def convert_one(mp3_file, options, cache_dir=None):
+    """在工作进程中完整运行一次 加载 → STFT → 分段 → 生成代码，只返回可序列化的摘要
+
+    指定 cache_dir 时各进程共用同一个磁盘分析缓存。
+    """
+    # 在函数内导入：图形界面导入本模块时不必等待 librosa 加载
+    from cache import AnalysisCache
+    from converter import WinsoundConverter
+
+    start = time.perf_counter()
+    messages = []
+    cache = AnalysisCache(cache_dir) if cache_dir else None
+    converter = WinsoundConverter(log_callback=messages.append, cache=cache)
+    try:
+        result = converter.mp3_to_winsound(mp3_file, **options)
+    except Exception as e:
+        return {
+            'mp3_file': mp3_file,
+            'ok': False,
+            'error': str(e) or type(e).__name__,
+            'elapsed': time.perf_counter() - start,
+            'log': messages,
+        }
+    return {
+        'mp3_file': mp3_file,
+        'ok': True,
+        'output_file': result['output_file'],
+        'segments': len(result['frequencies']),
+        'timings': result['timer'].report(),
+        'elapsed': time.perf_counter() - start,
+        'log': messages,
+    }
+
+
+def batch_convert(mp3_files, options=None, workers=None, on_result=None, cache_dir=None):
+    """用进程池并行转换多个文件
+
+    workers 为进程数，默认使用全部CPU核心；on_result(result) 在每个文件完成时调用；
+    cache_dir 为共用的磁盘分析缓存目录，None 表示不使用缓存。
+    单个文件出错不会中断其他文件，错误信息记录在对应结果的 'error' 中。
+    同一文件只转换一次；默认输出文件名相同的输入改用带扩展名的输出文件(见 output_files)。
+    返回与去重后的 mp3_files 顺序一致的结果列表。
+    """
+    options = dict(options or {})
+    mp3_files = unique_files(mp3_files)
+    outputs = output_files(mp3_files)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(mp3_files)))
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(convert_one, mp3_file, dict(options, output_file=outputs[mp3_file]), cache_dir): mp3_file
+            for mp3_file in mp3_files
+        }
+        for future in as_completed(futures):
+            mp3_file = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # 工作进程本身崩溃(例如内存不足被杀)
+                result = {'mp3_file': mp3_file, 'ok': False, 'error': str(e) or type(e).__name__, 'elapsed': 0.0, 'log': []}
+            results[mp3_file] = result
+            if on_result is not None:
+                on_result(result)
+
+    return [results[mp3_file] for mp3_file in mp3_files]
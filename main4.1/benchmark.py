@@ -0,0 +1,592 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import soundfile as sf
+
+import segmentation
+from analysis import dominant_frequencies, fixed_segment_frequencies
+from converter import ANALYSIS_SR, HOP_LENGTH, WinsoundConverter
+from decoder import BACKENDS, decode_native, get_backend, resample
+from pitch import EXTRACTORS, get_extractor, prepare_input
+from presets import PRESETS, estimate, get_preset
+
+# 性能套件的输入时长(秒)，从10秒到2小时
+SUITE_DURATIONS = (10, 60, 600, 1800, 7200)
+# 性能套件的合成信号(见 synthetic_signal)
+SUITE_SIGNALS = ('sweep', 'chord', 'silence', 'noise', 'vibrato')
+# 复杂度检查：时长对数与耗时对数拟合的斜率超过此值即判定为超线性(线性约为1，平方约为2)
+MAX_SCALING_EXPONENT = 1.5
+# 单次耗时短于此值(秒)的阶段重复运行取平均，减少计时噪声
+MIN_TIMED_SECONDS = 0.05
+# 参与斜率拟合的最短时长，更短的输入耗时主要是固定开销
+SCALING_MIN_SECONDS = 60
+# 'vibrato' 合成信号：每个音符的时长(秒)、颤音频率(Hz)和幅度(相对频率)
+VIBRATO_NOTE_SECONDS = 2.0
+VIBRATO_RATE = 6.0
+VIBRATO_DEPTH = 0.03
+
+
+def legacy_dominant_frequencies(magnitude, freqs):
+    """旧版逐帧循环实现，仅用于对比"""
+    main_freqs = []
+    for i in range(magnitude.shape[1]):
+        max_freq_idx = np.argmax(magnitude[:, i])
+        main_freq = freqs[max_freq_idx]
+        if 20 <= main_freq <= 20000:
+            main_freqs.append(main_freq)
+        else:
+            valid_indices = np.where((freqs >= 20) & (freqs <= 20000))[0]
+            if len(valid_indices) > 0:
+                valid_magnitudes = magnitude[valid_indices, i]
+                max_valid_idx = valid_indices[np.argmax(valid_magnitudes)]
+                main_freqs.append(freqs[max_valid_idx])
+            else:
+                main_freqs.append(440)
+    return main_freqs
+
+
+def legacy_fixed_segments(y, sr, fixed_duration):
+    """旧版固定模式逐段完整FFT实现，仅用于对比"""
+    num_segments = int(len(y) / sr / fixed_duration)
+    processed_freqs = []
+    for i in range(num_segments):
+        segment = y[int(i * fixed_duration * sr):int((i + 1) * fixed_duration * sr)]
+        fft = np.fft.fft(segment)
+        freqs = np.fft.fftfreq(len(segment), 1 / sr)
+        magnitude = np.abs(fft)
+        main_freq = freqs[:len(freqs) // 2][np.argmax(magnitude[:len(magnitude) // 2])]
+        processed_freqs.append(main_freq if 20 <= main_freq <= 20000 else 440)
+    return processed_freqs
+
+
+def legacy_similar_runs(frequencies, times):
+    """旧版动态/自动模式共用的逐帧扫描，返回 (起始下标, 结束下标) 列表，仅用于对比"""
+    runs = []
+    i = 0
+    while i < len(frequencies):
+        j = i + 1
+        while j < len(frequencies) and abs(frequencies[j] - frequencies[i]) <= 50.0:
+            j += 1
+        runs.append((i, j))
+        i = j
+    return runs
+
+
+def legacy_process_dynamic_segments(frequencies, times, min_duration):
+    """旧版动态模式，仅用于对比"""
+    processed_freqs = []
+    processed_durations = []
+    for i, j in legacy_similar_runs(frequencies, times):
+        duration = times[j - 1] - times[i]
+        if duration >= min_duration:
+            processed_freqs.append(np.mean(frequencies[i:j]))
+            processed_durations.append(duration)
+    return processed_freqs, processed_durations
+
+
+def legacy_merge_short_segments(frequencies, times, min_duration):
+    """旧版最短时长合并，仅用于对比"""
+    merged_freqs = []
+    merged_durations = []
+    current_freq = frequencies[0]
+    current_start_time = times[0]
+    for i in range(1, len(frequencies)):
+        duration = times[i] - current_start_time
+        if duration >= min_duration:
+            merged_freqs.append(current_freq)
+            merged_durations.append(duration)
+            current_freq = frequencies[i]
+            current_start_time = times[i]
+    final_duration = times[-1] - current_start_time + (times[-1] - times[-2])
+    if final_duration >= min_duration:
+        merged_freqs.append(current_freq)
+        merged_durations.append(final_duration)
+    return merged_freqs, merged_durations
+
+
+def synthetic_frequencies(n_frames, sr=22050, n_fft=2048, hop_length=512, seed=0):
+    """生成类似真实音乐的逐帧主要频率：音符持续若干帧，帧间在相邻频点间抖动"""
+    rng = np.random.default_rng(seed)
+    bins = np.fft.rfftfreq(n_fft, 1 / sr)
+    note_lengths = rng.integers(1, 40, n_frames)
+    notes = np.repeat(rng.integers(10, 150, n_frames), note_lengths)[:n_frames]
+    jitter = rng.integers(-2, 3, n_frames) * (rng.random(n_frames) < 0.3)
+    frequencies = bins[np.clip(notes + jitter, 0, len(bins) - 1)]
+    times = np.arange(n_frames) * hop_length / sr
+    return frequencies, times
+
+
+def synthetic_long_notes(n_frames, sr=22050, n_fft=2048, hop_length=512, seed=0):
+    """生成长音符的逐帧主要频率：每个音符持续200-2000帧，每帧都在相邻频点间抖动(颤音)
+
+    每个音符都由远多于 segmentation.SCAN_WINDOW 个块组成，用于发现随段长超线性增长的分段实现。
+    """
+    rng = np.random.default_rng(seed)
+    bins = np.fft.rfftfreq(n_fft, 1 / sr)
+    note_lengths = rng.integers(200, 2000, n_frames // 200 + 1)
+    notes = np.repeat(rng.integers(10, 150, len(note_lengths)), note_lengths)[:n_frames]
+    jitter = rng.integers(-2, 3, n_frames)
+    frequencies = bins[np.clip(notes + jitter, 0, len(bins) - 1)]
+    times = np.arange(n_frames) * hop_length / sr
+    return frequencies, times
+
+
+def synthetic_magnitude(seconds, sr=22050, n_fft=2048, hop_length=512, seed=0):
+    """生成与librosa.stft输出形状相同的随机幅度矩阵，约一半帧的峰值落在0Hz上"""
+    rng = np.random.default_rng(seed)
+    n_frames = 1 + int(seconds * sr) // hop_length
+    magnitude = rng.random((1 + n_fft // 2, n_frames), dtype=np.float32)
+    magnitude[0, ::2] = 2.0  # 模拟直流分量过强，触发旧实现的回退分支
+    freqs = np.linspace(0, sr / 2, 1 + n_fft // 2)
+    return magnitude, freqs
+
+
+def time_call(func, *args, repeat=3):
+    """返回多次运行中最快的一次耗时(秒)"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_analyze_frequencies(seconds):
+    """对比逐帧循环与整矩阵实现的每秒帧数"""
+    magnitude, freqs = synthetic_magnitude(seconds)
+    n_frames = magnitude.shape[1]
+
+    before = np.asarray(legacy_dominant_frequencies(magnitude, freqs))
+    after = dominant_frequencies(magnitude, freqs)
+    assert np.array_equal(before, after), "新旧实现结果不一致"
+
+    t_before = time_call(legacy_dominant_frequencies, magnitude, freqs)
+    t_after = time_call(dominant_frequencies, magnitude, freqs)
+    print(f"analyze_frequencies ({seconds:.0f}秒音频, {n_frames}帧)")
+    print(f"  逐帧循环: {n_frames / t_before:12.0f} 帧/秒")
+    print(f"  整矩阵:   {n_frames / t_after:12.0f} 帧/秒  (加速 {t_before / t_after:.1f}x)")
+
+
+def bench_fixed_segments(seconds, fixed_duration=0.1, sr=22050):
+    """对比逐段FFT与批量rFFT的每秒段数"""
+    rng = np.random.default_rng(0)
+    y = rng.standard_normal(int(seconds * sr)).astype(np.float32)
+    n_segments = int(seconds / fixed_duration)
+
+    before = np.asarray(legacy_fixed_segments(y, sr, fixed_duration))
+    after, _ = fixed_segment_frequencies(y, sr, fixed_duration)
+    assert np.allclose(before, after[:len(before)]), "新旧实现结果不一致"
+
+    t_before = time_call(legacy_fixed_segments, y, sr, fixed_duration)
+    t_after = time_call(fixed_segment_frequencies, y, sr, fixed_duration)
+    print(f"固定模式 ({seconds:.0f}秒音频, {n_segments}段, 每段{fixed_duration}秒)")
+    print(f"  逐段FFT:  {n_segments / t_before:12.0f} 段/秒")
+    print(f"  批量rFFT: {n_segments / t_after:12.0f} 段/秒  (加速 {t_before / t_after:.1f}x)")
+
+
+def bench_segmenters(n_frames=1_000_000, min_duration=0.1, freq_threshold=50.0):
+    """对比逐帧循环与向量化分段的每秒帧数(短音符和带颤音的长音符两种输入)"""
+    for label, generate in (("短音符", synthetic_frequencies), ("长音符+颤音", synthetic_long_notes)):
+        frequencies, times = generate(n_frames)
+        print(f"分段 ({label}, {n_frames}帧)")
+        bench_segmenters_on(frequencies, times, min_duration, freq_threshold)
+
+
+def bench_segmenters_on(frequencies, times, min_duration, freq_threshold):
+    """在一组逐帧频率上对比各分段实现"""
+    n_frames = len(frequencies)
+
+    cases = [
+        ("动态模式", lambda: legacy_process_dynamic_segments(frequencies, times, min_duration),
+         lambda: segmentation.process_dynamic_segments(frequencies, times, min_duration, freq_threshold)),
+        ("最短时长合并", lambda: legacy_merge_short_segments(frequencies, times, min_duration),
+         lambda: segmentation.merge_short_segments(frequencies, times, min_duration)),
+    ]
+    for name, legacy, vectorized in cases:
+        start = time.perf_counter()
+        before = legacy()
+        t_before = time.perf_counter() - start
+        after = vectorized()
+        assert all(np.array_equal(np.asarray(x), y) for x, y in zip(before, after)), f"{name}新旧实现结果不一致"
+        t_after = time_call(vectorized)
+        print(f"  {name}: 逐帧循环 {n_frames / t_before:12.0f} 帧/秒, "
+              f"向量化 {n_frames / t_after:12.0f} 帧/秒  (加速 {t_before / t_after:.1f}x)")
+
+    t_auto = time_call(lambda: segmentation.process_auto_detection(frequencies, times, min_duration, freq_threshold, 100.0))
+    print(f"  自动检测: 向量化 {n_frames / t_auto:12.0f} 帧/秒 (扫描规则与动态模式相同)")
+
+
+def synthetic_signal(kind, seconds, sr=ANALYSIS_SR, seed=0, chunk_seconds=10):
+    """生成合成音频(float32)，按 chunk_seconds 分块生成，两小时的输入也不会产生成倍的临时数组
+
+    kind: 'sweep' 100Hz-5kHz 对数扫频(每10秒一次)，'chord' 每0.5秒换一次的三和弦，
+    'silence' 80%时间静音、其余为短音符，'noise' 白噪声，
+    'vibrato' 每2秒一个带颤音的长音符(6Hz、±3%)，峰值在相邻频点间来回跳动，每个音符远多于
+    segmentation.SCAN_WINDOW 个块，随段长超线性增长的分段实现会在复杂度检查中失败。
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sr)
+    # 颤音音符事先一次生成，分块时按全局时间取用
+    vibrato_notes = 220 * 2 ** (rng.integers(0, 24, int(seconds / VIBRATO_NOTE_SECONDS) + 2) / 12)
+    y = np.empty(n, dtype=np.float32)
+    chunk = int(chunk_seconds * sr)
+    for start in range(0, n, chunk):
+        t = np.arange(start, min(start + chunk, n)) / sr
+        if kind == 'sweep':
+            # 对数扫频的相位在每个周期内有解析式，块与块之间天然连续
+            period = 10.0
+            k = np.log(5000 / 100) / period
+            phase = 2 * np.pi * 100 * np.expm1(k * (t % period)) / k
+            block = 0.5 * np.sin(phase)
+        elif kind == 'chord':
+            roots = 220 * 2 ** (rng.integers(0, 12, len(t) // int(0.5 * sr) + 2) / 12)
+            root = roots[((t - t[0]) // 0.5).astype(int)]
+            block = sum(np.sin(2 * np.pi * root * ratio * t) for ratio in (1, 1.25, 1.5)) / 3
+        elif kind == 'silence':
+            notes = 440 * 2 ** (rng.integers(-12, 12, len(t) // int(0.1 * sr) + 2) / 12)
+            slot = ((t - t[0]) // 0.1).astype(int)
+            audible = rng.random(len(notes)) < 0.2
+            block = np.where(audible[slot], 0.5 * np.sin(2 * np.pi * notes[slot] * t), 0.0)
+        elif kind == 'noise':
+            block = 0.3 * rng.standard_normal(len(t))
+        elif kind == 'vibrato':
+            note = vibrato_notes[(t // VIBRATO_NOTE_SECONDS).astype(int)]
+            local = t % VIBRATO_NOTE_SECONDS
+            # f(t) = f0 * (1 + depth * sin(2π·rate·t)) 的相位积分
+            phase = 2 * np.pi * note * (local + VIBRATO_DEPTH * (1 - np.cos(2 * np.pi * VIBRATO_RATE * local))
+                                        / (2 * np.pi * VIBRATO_RATE))
+            block = 0.5 * np.sin(phase)
+        else:
+            raise ValueError(f"未知的信号类型: {kind}")
+        y[start:start + len(t)] = block
+    return y
+
+
+def measure(func, trace_memory=True):
+    """运行 func()，返回 (结果, 耗时秒数, 峰值内存字节数或None)
+
+    很快的阶段重复运行到累计约 MIN_TIMED_SECONDS，取最快的一次；
+    再在 tracemalloc 下单独运行一次取峰值内存，避免追踪开销影响计时。
+    """
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    if elapsed < MIN_TIMED_SECONDS:
+        repeat = int(MIN_TIMED_SECONDS / max(elapsed, 1e-6)) + 1
+        elapsed = min(elapsed, time_call(func, repeat=repeat))
+    peak = None
+    if trace_memory:
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def suite_stages(y, sr, min_duration=0.1, freq_threshold=50.0, fixed_duration=0.1):
+    """返回 [(阶段名, 函数), ...]，后面的阶段依赖前面的结果，因此按顺序执行"""
+    converter = WinsoundConverter(log_callback=lambda message: None)
+    state = {}
+
+    def analyze():
+        state['frequencies'], state['times'], _ = converter.analyze_frequencies(y, sr)
+
+    def fixed():
+        state['fixed_freqs'], state['fixed_durations'] = fixed_segment_frequencies(y, sr, fixed_duration)
+
+    return [
+        ("analyze_frequencies", analyze),
+        ("动态分段", lambda: segmentation.process_dynamic_segments(state['frequencies'], state['times'], min_duration, freq_threshold)),
+        ("自动检测", lambda: segmentation.process_auto_detection(state['frequencies'], state['times'], min_duration, freq_threshold, 100.0)),
+        ("最短时长合并", lambda: segmentation.merge_short_segments(state['frequencies'], state['times'], min_duration)),
+        ("固定模式rFFT", fixed),
+        ("generate_python_code", lambda: converter.generate_python_code(state['fixed_freqs'], state['fixed_durations'])),
+    ]
+
+
+def scaling_exponent(seconds, elapsed):
+    """在对数坐标下拟合 耗时 ~ 时长^k，返回 k"""
+    return float(np.polyfit(np.log(seconds), np.log(elapsed), 1)[0])
+
+
+def run_suite(durations=SUITE_DURATIONS, signals=SUITE_SIGNALS, trace_memory=True):
+    """对每种合成信号和每个时长运行所有阶段，打印耗时、峰值内存和吞吐量，返回复杂度检查是否通过"""
+    sr = ANALYSIS_SR
+    timings = {}
+    # 预热：首次调用 librosa 时的延迟导入和初始化不计入第一组结果
+    for _, func in suite_stages(synthetic_signal('noise', 1, sr), sr):
+        func()
+    print(f"{'信号':<8}{'时长(秒)':>9}  {'阶段':<22}{'耗时(秒)':>10}{'峰值内存(MB)':>14}{'吞吐':>16}")
+    for kind in signals:
+        for seconds in durations:
+            y = synthetic_signal(kind, seconds, sr)
+            n_frames = 1 + len(y) // HOP_LENGTH
+            for name, func in suite_stages(y, sr):
+                result, elapsed, peak = measure(func, trace_memory)
+                timings.setdefault((kind, name), []).append((seconds, elapsed))
+                if name == "generate_python_code":
+                    throughput = f"{len(result.splitlines()) / elapsed:10.0f} 行/秒"
+                else:
+                    throughput = f"{n_frames / elapsed:10.0f} 帧/秒"
+                memory = f"{peak / 2**20:.1f}" if peak is not None else "-"
+                print(f"{kind:<8}{seconds:>9}  {name:<22}{elapsed:>10.3f}{memory:>14}{throughput:>16}")
+            del y
+
+    # 复杂度检查：只用足够长的输入拟合，短输入的耗时以固定开销为主。
+    # 整体拟合会被接近固定开销的较短输入拉低，因此同时检查最长两个时长之间的斜率，取两者中较大的
+    print("\n复杂度检查(耗时 ~ 时长^k，k 取整体拟合与最长两个时长之间斜率的较大者):")
+    passed = True
+    for (kind, name), points in timings.items():
+        points = sorted((seconds, elapsed) for seconds, elapsed in points if seconds >= SCALING_MIN_SECONDS)
+        if len(points) < 2:
+            continue
+        k_fit = scaling_exponent(*zip(*points))
+        k_tail = scaling_exponent(*zip(*points[-2:]))
+        k = max(k_fit, k_tail)
+        ok = k <= MAX_SCALING_EXPONENT
+        passed &= ok
+        print(f"  {kind:<8}{name:<22} k = {k:5.2f} (拟合 {k_fit:5.2f}, 最长两点 {k_tail:5.2f})  {'通过' if ok else '失败: 超线性增长'}")
+    if sum(seconds >= SCALING_MIN_SECONDS for seconds in durations) < 2:
+        print(f"  至少需要两个不短于{SCALING_MIN_SECONDS}秒的时长才能检查")
+    return passed
+
+
+def bench_extractors(y, sr, names=None, trace_memory=True):
+    """在同一段输入上运行各音高提取器，并列输出耗时、峰值内存、吞吐量和产生的音调段数
+
+    每个提取器先把输入重采样到自己的分析采样率(不计时)，与各版本实际的处理流程一致。
+    """
+    extractors = [get_extractor(name) for name in (names or EXTRACTORS)]
+    seconds = len(y) / sr
+    print(f"音高提取器对比 (输入 {seconds:.1f} 秒, {sr} Hz)")
+    print(f"{'提取器':<10}{'耗时(秒)':>10}{'峰值内存(MB)':>14}{'帧/秒':>12}{'实时倍数':>10}{'段数':>9}  说明")
+    for extractor in extractors:
+        y_in, sr_in = prepare_input(extractor, y, sr)
+        # 预热：首次调用的初始化开销不计入
+        extractor.extract(y_in[:sr_in], sr_in)
+        (freqs, _), elapsed, peak = measure(lambda: extractor.extract(y_in, sr_in), trace_memory)
+        n_frames = 1 + len(y_in) // HOP_LENGTH
+        memory = f"{peak / 2**20:.1f}" if peak is not None else "-"
+        print(f"{extractor.name:<10}{elapsed:>10.3f}{memory:>14}{n_frames / elapsed:>12.0f}"
+              f"{seconds / elapsed:>9.0f}x{len(freqs):>9}  {extractor.description}")
+
+
+def sweep_frequency(t, period=10.0, f_start=100.0, f_end=5000.0):
+    """synthetic_signal('sweep') 在时刻 t 的瞬时频率"""
+    k = np.log(f_end / f_start) / period
+    return f_start * np.exp(k * (np.asarray(t) % period))
+
+
+def bench_presets(seconds, names=None, input_sr=44100, trace_memory=True):
+    """在同一段 100Hz-5kHz 对数扫频上比较各分析预设的耗时和音高误差
+
+    耗时包括重采样和分块STFT；误差是检测到的频率与扫频瞬时频率之差(音分)，
+    扫频回绕处一个窗长内的帧不计入。同时核对预测帧数与实际帧数。
+    """
+    presets = [get_preset(name) for name in (names or PRESETS)]
+    y = synthetic_signal('sweep', seconds, input_sr)
+    converter = WinsoundConverter(log_callback=lambda message: None)
+    print(f"分析预设对比 (输入 {seconds:.0f} 秒 100Hz-5kHz 扫频, {input_sr} Hz)")
+    print(f"{'预设':<10}{'采样率':>8}{'n_fft':>7}{'hop':>5}{'帧数':>9}{'预测帧数':>10}{'相对计算量':>11}"
+          f"{'耗时(秒)':>10}{'峰值内存(MB)':>14}{'实时倍数':>10}{'误差中位数(音分)':>18}{'半音内':>9}")
+    for preset in presets:
+        def run():
+            y_in = resample(y, input_sr, preset.sr)
+            return converter.analyze_frequencies(y_in, preset.sr, preset.hop_length, preset.n_fft)
+
+        # 预热：首次调用的初始化开销不计入
+        converter.analyze_frequencies(y[:preset.sr], preset.sr, preset.hop_length, preset.n_fft)
+        (freqs, times, _), elapsed, peak = measure(run, trace_memory)
+        predicted = estimate(preset, seconds)
+        window = preset.n_fft / preset.sr
+        phase = times % 10.0
+        valid = (phase > window) & (phase < 10.0 - window) & (times > window) & (times < seconds - window) & (freqs > 0)
+        cents = np.abs(1200 * np.log2(freqs[valid] / sweep_frequency(times[valid])))
+        memory = f"{peak / 2**20:.1f}" if peak is not None else "-"
+        print(f"{preset.name:<10}{preset.sr:>8}{preset.n_fft:>7}{preset.hop_length:>5}{len(freqs):>9}{predicted.frames:>10}"
+              f"{predicted.relative_cost:>10.2f}x{elapsed:>10.3f}{memory:>14}{seconds / elapsed:>9.0f}x"
+              f"{np.median(cents):>18.1f}{np.mean(cents < 50) * 100:>8.1f}%")
+
+
+def write_test_files(y, sr, directory):
+    """把合成音频写成 WAV/FLAC/MP3(立体声)，文件名含中文以覆盖 Unicode 路径，返回文件路径列表"""
+    stereo = np.stack([y, y], axis=1)
+    paths = []
+    for extension, fmt in (('wav', 'WAV'), ('flac', 'FLAC'), ('mp3', 'MP3')):
+        path = os.path.join(directory, f"测试音频.{extension}")
+        sf.write(path, stereo, sr, format=fmt)
+        paths.append(path)
+    return paths
+
+
+def bench_decoders(paths, names=None, target_sr=ANALYSIS_SR):
+    """对每个文件分别用各解码后端解码，输出解码耗时、实时倍数和文件吞吐量，以及重采样到 target_sr 的耗时
+
+    后端不支持该格式时显示原因，不中断其余测试。
+    """
+    backends = [get_backend(name) for name in (names or BACKENDS)]
+    print(f"解码后端对比 (重采样到 {target_sr} Hz)")
+    print(f"{'文件':<16}{'后端':<11}{'解码(秒)':>10}{'实时倍数':>10}{'MB/秒':>9}{'重采样(秒)':>12}")
+    for path in paths:
+        size_mb = os.path.getsize(path) / 2**20
+        label = os.path.basename(path)
+        for backend in backends:
+            try:
+                with warnings.catch_warnings():
+                    # audioread 依赖的 audioop 等模块的弃用提示
+                    warnings.simplefilter('ignore')
+                    # 预热：首次调用的导入和初始化开销不计入
+                    decode_native(path, [backend.name])
+                    start = time.perf_counter()
+                    y, native_sr, _ = decode_native(path, [backend.name])
+                    elapsed = time.perf_counter() - start
+            except Exception as e:
+                print(f"{label:<16}{backend.name:<11}  不支持: {str(e) or type(e).__name__}")
+                continue
+            resample(y[:native_sr], native_sr, target_sr)
+            start = time.perf_counter()
+            resample(y, native_sr, target_sr)
+            resample_elapsed = time.perf_counter() - start
+            seconds = len(y) / native_sr
+            print(f"{label:<16}{backend.name:<11}{elapsed:>10.3f}{seconds / elapsed:>9.0f}x"
+                  f"{size_mb / elapsed:>9.1f}{resample_elapsed:>12.3f}")
+
+
+# 冷启动测试在新进程中运行的脚本，输出各时间点(秒，从脚本开始计时)的JSON
+STARTUP_PROBE = '''
+import json, time
+start = time.perf_counter()
+import function
+result = {'import_gui': time.perf_counter() - start}
+try:
+    app = function.MP3ToWinsoundApp()
+except Exception:
+    # 没有图形显示环境时只测量模块导入
+    result['heavy_imports'] = function.import_heavy_modules()
+else:
+    app.update()
+    result['window_shown'] = time.perf_counter() - start
+    def wait_ready():
+        if app.converter is None:
+            app.after(10, wait_ready)
+            return
+        result['ready'] = time.perf_counter() - start
+        app.destroy()
+    wait_ready()
+    app.mainloop()
+print(json.dumps(result))
+'''
+
+# 对照组：旧版在显示窗口之前同步导入的模块
+EAGER_PROBE = '''
+import json, time
+start = time.perf_counter()
+import tkinter, librosa, librosa.display, numpy, soundfile
+import matplotlib.pyplot
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import converter
+print(json.dumps({'eager_imports': time.perf_counter() - start}))
+'''
+
+
+def run_probe(probe):
+    """在新的Python进程中运行探测脚本，返回其输出的JSON"""
+    output = subprocess.run([sys.executable, '-c', probe], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def bench_startup(repeat=3):
+    """图形界面冷启动测试：每次在新进程中测量窗口显示和依赖模块加载完成的时间，取中位数
+
+    没有图形显示环境时改为测量 function 模块本身的导入时间和后台加载的模块导入时间。
+    对照组为旧版在显示窗口前同步导入全部依赖的时间。
+    """
+    runs = [run_probe(STARTUP_PROBE) for _ in range(repeat)]
+    eager = [run_probe(EAGER_PROBE)['eager_imports'] for _ in range(repeat)]
+
+    def median(key):
+        return float(np.median([run[key] for run in runs]))
+
+    print(f"图形界面冷启动 (新进程, {repeat}次取中位数)")
+    print(f"  旧版: 同步导入全部依赖后才能显示窗口 {float(np.median(eager)):.3f} 秒")
+    print(f"  导入 function 模块: {median('import_gui'):.3f} 秒")
+    if 'window_shown' in runs[0]:
+        print(f"  窗口显示: {median('window_shown'):.3f} 秒")
+        print(f"  依赖加载完成，可以开始转换: {median('ready'):.3f} 秒")
+    else:
+        print(f"  (没有图形显示环境) 后台加载依赖模块: {median('heavy_imports'):.3f} 秒")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MP3到Winsound转换器性能测试")
+    parser.add_argument("--seconds", type=float, default=300, help="合成音频时长(秒)")
+    parser.add_argument("--frames", type=int, default=1_000_000, help="分段测试的帧数")
+    parser.add_argument("--suite", action="store_true",
+                        help="运行完整性能套件：多种合成信号、10秒到2小时，含复杂度检查(失败时返回非零)")
+    parser.add_argument("--durations", type=lambda text: [int(value) for value in text.split(',')],
+                        default=list(SUITE_DURATIONS), help="性能套件的时长列表(秒)，逗号分隔")
+    parser.add_argument("--signals", type=lambda text: text.split(','), default=list(SUITE_SIGNALS),
+                        help=f"性能套件的信号类型，逗号分隔: {','.join(SUITE_SIGNALS)}")
+    parser.add_argument("--no-memory", action="store_true", help="性能套件不统计峰值内存(省去一次重复运行)")
+    parser.add_argument("--extractors", nargs="*", metavar="NAME",
+                        help=f"对比音高提取器(不指定名称时全部运行): {', '.join(EXTRACTORS)}")
+    parser.add_argument("--decoders", nargs="*", metavar="NAME",
+                        help=f"对比解码后端的吞吐量(不指定名称时全部运行): {', '.join(BACKENDS)}")
+    parser.add_argument("--presets", nargs="*", metavar="NAME",
+                        help=f"对比分析预设的耗时和精度(--seconds 秒的扫频，不指定名称时全部运行): {', '.join(PRESETS)}")
+    parser.add_argument("--startup", action="store_true", help="图形界面冷启动测试(每次在新进程中运行)")
+    parser.add_argument("--input", help="音高提取器或解码后端对比使用的音频文件"
+                                        "(默认: --seconds 秒的合成和弦, 44100Hz；解码对比时写成WAV/FLAC/MP3)")
+    args = parser.parse_args()
+
+    if args.startup:
+        bench_startup()
+        return 0
+    if args.suite:
+        return 0 if run_suite(args.durations, args.signals, not args.no_memory) else 1
+    if args.presets is not None:
+        try:
+            bench_presets(args.seconds, args.presets or None, trace_memory=not args.no_memory)
+        except ValueError as e:
+            parser.error(str(e))
+        return 0
+    if args.decoders is not None:
+        try:
+            if args.input:
+                bench_decoders([args.input], args.decoders or None)
+            else:
+                with tempfile.TemporaryDirectory() as directory:
+                    paths = write_test_files(synthetic_signal('chord', args.seconds, 44100), 44100, directory)
+                    bench_decoders(paths, args.decoders or None)
+        except ValueError as e:
+            parser.error(str(e))
+        return 0
+    if args.extractors is not None:
+        if args.input:
+            y, sr, _ = decode_native(args.input)
+        else:
+            sr = 44100
+            y = synthetic_signal('chord', args.seconds, sr)
+        try:
+            bench_extractors(y, sr, args.extractors or None, not args.no_memory)
+        except ValueError as e:
+            parser.error(str(e))
+        return 0
+
+    bench_analyze_frequencies(args.seconds)
+    bench_fixed_segments(args.seconds)
+    bench_segmenters(args.frames)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
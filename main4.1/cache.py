@@ -0,0 +1,169 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "mp3-2-winsound")
+# 磁盘缓存总大小上限(字节)
+DEFAULT_MAX_DISK_BYTES = 1024 * 1024 * 1024
+# 内存缓存总大小上限(字节)
+DEFAULT_MAX_MEMORY_BYTES = 256 * 1024 * 1024
+
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """计算文件内容的SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def entry_bytes(entry):
+    """缓存条目中所有数组(包括频谱)占用的字节数"""
+    arrays = list(entry.values())
+    if entry.get('spectrogram') is not None:
+        arrays.extend(entry['spectrogram'].values())
+    return sum(value.nbytes for value in arrays if isinstance(value, np.ndarray))
+
+
+class AnalysisCache:
+    """解码后的PCM和逐帧频率的缓存(内存 + 磁盘.npz)
+
+    以文件内容哈希、采样率、hop_length 和 n_fft 为键，相同文件改名或移动后仍能命中。
+    内存和磁盘两级都按总字节数做LRU淘汰。
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_disk_bytes=DEFAULT_MAX_DISK_BYTES, max_memory_bytes=DEFAULT_MAX_MEMORY_BYTES):
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        # (路径, 修改时间, 大小) -> 内容哈希，避免同一文件每次都重新计算哈希
+        self._hashes = {}
+        self._lock = threading.Lock()
+
+    def key(self, audio_file, sr, hop_length, n_fft, variant="stft"):
+        """生成缓存键，variant 区分分析引擎和频带"""
+        stat = os.stat(audio_file)
+        stat_key = (os.path.abspath(audio_file), stat.st_mtime_ns, stat.st_size)
+        content_hash = self._hashes.get(stat_key)
+        if content_hash is None:
+            content_hash = file_hash(audio_file)
+            self._hashes[stat_key] = content_hash
+        if variant == "stft":
+            # 与加入 variant 之前的缓存文件名相同
+            return f"{content_hash}_{sr}_{hop_length}_{n_fft}"
+        return f"{content_hash}_{sr}_{hop_length}_{n_fft}_{variant}"
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".npz")
+
+    def get(self, key):
+        """返回缓存的条目字典(y, sr, frequencies, times, spectrogram)，未命中返回None"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                entry = {
+                    'y': data['y'],
+                    'sr': int(data['sr']),
+                    'frequencies': data['frequencies'],
+                    'times': data['times'],
+                    'spectrogram': None,
+                }
+                if 'spec_magnitude' in data:
+                    entry['spectrogram'] = {
+                        'magnitude': data['spec_magnitude'],
+                        'freqs': data['spec_freqs'],
+                        'times': data['spec_times'],
+                    }
+            # 更新访问时间，磁盘淘汰时按它排序
+            os.utime(path)
+        except (OSError, KeyError, ValueError):
+            return None
+
+        self._remember(key, entry)
+        return entry
+
+    def put(self, key, y, sr, frequencies, times, spectrogram=None):
+        """写入缓存，磁盘写入先写临时文件再替换，多进程同时写同一个键也是安全的"""
+        entry = {
+            'y': np.asarray(y, dtype=np.float32),
+            'sr': int(sr),
+            'frequencies': np.asarray(frequencies),
+            'times': np.asarray(times),
+            'spectrogram': spectrogram,
+        }
+        self._remember(key, entry)
+
+        arrays = {name: entry[name] for name in ('y', 'sr', 'frequencies', 'times')}
+        if spectrogram is not None:
+            # 只保存缩小到显示分辨率的频谱，命中缓存时同样无需重新计算STFT
+            arrays.update(spec_magnitude=spectrogram['magnitude'], spec_freqs=spectrogram['freqs'], spec_times=spectrogram['times'])
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(temp_path, path)
+        except OSError:
+            # 磁盘缓存失败不影响转换
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        self._evict_disk()
+
+    def clear(self):
+        """清空内存和磁盘缓存"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".npz"):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+    def _remember(self, key, entry):
+        size = entry_bytes(entry)
+        with self._lock:
+            if key in self._memory:
+                return
+            self._memory[key] = entry
+            self._memory_bytes += size
+            # 至少保留最新的一条，即使它本身超过上限
+            while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+                _, old = self._memory.popitem(last=False)
+                self._memory_bytes -= entry_bytes(old)
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npz"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
@@ -0,0 +1,179 @@
+import argparse
+import os
+import sys
+
+from batch import batch_convert, collect_audio_files
+from cache import DEFAULT_CACHE_DIR, AnalysisCache
+from converter import WinsoundConverter
+from presets import DEFAULT_BAND, DEFAULT_ENGINE, DEFAULT_OUTPUT_FORMAT, DEFAULT_PRESET, ENGINES, OUTPUT_FORMATS, PRESETS
+from progress import format_progress
+from worker import WorkerUnavailable, submit
+
+
+def display_width(text):
+    """终端中的显示宽度，中文等全角字符占两列"""
+    return sum(2 if ord(char) >= 0x2E80 else 1 for char in text)
+
+
+class ConsoleProgress:
+    """在终端的同一行刷新进度，日志照常逐行输出；输出不是终端(如重定向到文件)时不显示进度"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+        self.enabled = self.stream.isatty()
+        self.width = 0
+
+    def clear(self):
+        if self.width:
+            self.stream.write("\r" + " " * self.width + "\r")
+            self.stream.flush()
+            self.width = 0
+
+    def log(self, message):
+        self.clear()
+        print(message)
+
+    def progress(self, event):
+        if not self.enabled:
+            return
+        text = f"[{event.percent:5.1f}%] {format_progress(event)}"
+        self.stream.write("\r" + text + " " * max(0, self.width - display_width(text)))
+        self.stream.flush()
+        self.width = max(self.width, display_width(text))
+
+
+def parse_band(text):
+    """解析 --band 参数，格式为 FMIN,FMAX"""
+    try:
+        fmin, fmax = (float(value) for value in text.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"频带格式应为 FMIN,FMAX: {text}") from None
+    if not 0 < fmin < fmax:
+        raise argparse.ArgumentTypeError(f"频带下限应小于上限且大于0: {text}")
+    return fmin, fmax
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="MP3到Winsound.Beep转换器(命令行版，无需图形界面)")
+    parser.add_argument("mp3_files", nargs="+", help="MP3文件或目录路径，多个文件或目录时批量转换")
+    parser.add_argument("-o", "--output", help="输出Python文件路径(默认: <输入文件名>_winsound.py)，仅单文件时有效")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="批量转换的进程数(默认: CPU核心数)")
+    parser.add_argument("-f", "--function-name", help="生成的函数名称(默认: main)")
+    parser.add_argument("-m", "--mode", choices=["fixed", "dynamic", "auto"], default="fixed",
+                        help="持续时间模式: fixed=固定持续时间, dynamic=动态持续时间, auto=自动检测")
+    parser.add_argument("--fixed-duration", type=float, default=0.5, help="固定持续时间(秒)")
+    parser.add_argument("--min-duration", type=float, default=0.1, help="最短持续时间(秒)")
+    parser.add_argument("--freq-threshold", type=float, default=50.0, help="频率差异阈值(Hz)")
+    parser.add_argument("--low-freq-threshold", type=float, default=100.0, help="低频阈值(Hz)，仅自动检测模式")
+    parser.add_argument("-p", "--preset", choices=list(PRESETS), default=DEFAULT_PRESET,
+                        help="分析预设(同时决定采样率、n_fft和hop): "
+                             + "; ".join(f"{p.name}={p.description}" for p in PRESETS.values()))
+    parser.add_argument("--engine", choices=list(ENGINES), default=DEFAULT_ENGINE,
+                        help="分析引擎: stft=完整STFT, goertzel=频带内音符Goertzel滤波器组(最快)")
+    parser.add_argument("--band", type=parse_band, default=None, metavar="FMIN,FMAX",
+                        help=f"分析频带(Hz)，例如 37,5000(默认: stft 为 20,20000，频带引擎为 {DEFAULT_BAND[0]:g},{DEFAULT_BAND[1]:g})")
+    parser.add_argument("--format", choices=list(OUTPUT_FORMATS), default=DEFAULT_OUTPUT_FORMAT, dest="output_format",
+                        help="生成代码的格式: statements=每段一行Beep语句, table=压缩常量表加播放循环(长音频文件小得多)")
+    parser.add_argument("--no-coalesce", action="store_false", dest="coalesce",
+                        help="不合并相邻的相同Beep和相邻的sleep(每个音频段一次调用)")
+    parser.add_argument("--streaming", action="store_true", help="流式分析(适合长文件)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="分析缓存目录")
+    parser.add_argument("--no-cache", action="store_true", help="不使用分析缓存")
+    parser.add_argument("--worker", action="store_true",
+                        help="交给常驻分析进程(python worker.py)处理，未运行时在本进程中转换，仅单文件时有效")
+    parser.add_argument("--run", action="store_true", help="转换完成后立即运行生成的代码")
+    return parser
+
+
+def conversion_options(args):
+    """把命令行参数转换为 WinsoundConverter.mp3_to_winsound 的关键字参数"""
+    options = {"use_streaming": args.streaming, "preset": args.preset, "engine": args.engine, "band": args.band,
+               "output_format": args.output_format, "coalesce": args.coalesce}
+    if args.mode == "fixed":
+        options["fixed_duration"] = args.fixed_duration
+    elif args.mode == "dynamic":
+        options.update(min_duration=args.min_duration, freq_threshold=args.freq_threshold, use_dynamic=True)
+    else:
+        options.update(min_duration=args.min_duration, freq_threshold=args.freq_threshold,
+                       low_freq_threshold=args.low_freq_threshold, use_auto_detection=True)
+    return options
+
+
+def run_batch(args):
+    """批量转换多个文件，逐个报告结果"""
+    mp3_files = collect_audio_files(args.mp3_files)
+    if not mp3_files:
+        print("错误: 没有找到可转换的音频文件!")
+        return 1
+
+    options = conversion_options(args)
+    if args.function_name:
+        options["function_name"] = args.function_name
+
+    print(f"开始批量转换 {len(mp3_files)} 个文件...")
+    done = []
+
+    def report(result):
+        done.append(result)
+        if result['ok']:
+            print(f"[{len(done)}/{len(mp3_files)}] 完成: {result['mp3_file']} -> {result['output_file']} "
+                  f"({result['segments']} 个音调段, {result['elapsed']:.2f} 秒)")
+        else:
+            print(f"[{len(done)}/{len(mp3_files)}] 失败: {result['mp3_file']}: {result['error']}")
+
+    cache_dir = None if args.no_cache else args.cache_dir
+    try:
+        results = batch_convert(mp3_files, options, workers=args.workers, on_result=report, cache_dir=cache_dir)
+    except ValueError as e:
+        # 输出文件名冲突，一个文件都没有开始转换
+        print(f"错误: {str(e)}")
+        return 1
+    failed = [result for result in results if not result['ok']]
+    print(f"批量转换结束: 成功 {len(results) - len(failed)} 个，失败 {len(failed)} 个")
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    print("MP3到Winsound.Beep转换器")
+    print("-" * 40)
+
+    for path in args.mp3_files:
+        if not os.path.exists(path):
+            print(f"错误: 文件 '{path}' 不存在!")
+            return 1
+
+    if len(args.mp3_files) > 1 or os.path.isdir(args.mp3_files[0]):
+        return run_batch(args)
+
+    mp3_file = args.mp3_files[0]
+    cache = None if args.no_cache else AnalysisCache(args.cache_dir)
+    console = ConsoleProgress()
+    converter = WinsoundConverter(log_callback=console.log, progress_callback=console.progress, cache=cache)
+    try:
+        result = None
+        if args.worker:
+            try:
+                result = submit(mp3_file, args.output, args.function_name, conversion_options(args),
+                                on_log=console.log, on_progress=console.progress)
+            except WorkerUnavailable as e:
+                console.log(f"{str(e)}，改为在本进程中转换")
+        if result is None:
+            result = converter.mp3_to_winsound(mp3_file, args.output, args.function_name, **conversion_options(args))
+    except Exception as e:
+        console.clear()
+        print(f"转换过程中出错: {str(e)}")
+        return 1
+    console.clear()
+
+    print(f"转换完成! 生成的Python文件: {result['output_file']}")
+
+    if args.run:
+        print(f"\n正在运行: {result['output_file']}")
+        exec(result['python_code'], {'__name__': '__main__'})
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
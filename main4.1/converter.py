@@ -0,0 +1,451 @@
+import base64
+import os
+import zlib
+
+import librosa
+import numpy as np
+
+import segmentation
+from analysis import MAX_AUDIBLE_FREQ, MIN_AUDIBLE_FREQ, dominant_frequencies, fixed_segment_frequencies, pool_spectrogram, spectrogram_steps
+from band import BandAnalyzer, frame_view
+from decoder import audio_info, decode_native, resample
+from presets import DEFAULT_BAND, DEFAULT_ENGINE, DEFAULT_OUTPUT_FORMAT, DEFAULT_PRESET, ENGINES, OUTPUT_FORMATS, format_estimate, get_preset
+from progress import ProgressTracker
+from streaming import analyze_stream, stream_fixed_segments
+from timing import StageTimer, report_path
+
+# 分析使用的采样率和STFT参数(standard 预设，与librosa默认值一致)，其他预设见 presets.py
+ANALYSIS_SR = 22050
+N_FFT = 2048
+HOP_LENGTH = 512
+# 分块计算STFT时每块的帧数(只影响进度汇报粒度和峰值内存，不影响结果)
+STFT_CHUNK_FRAMES = 2048
+# 生成代码时每隔多少段汇报一次进度
+CODEGEN_REPORT_EVERY = 4096
+# table 格式中每行 base64 字符数
+TABLE_LINE_WIDTH = 76
+# table 格式中单条记录的最长持续时间(毫秒，uint16 上限)，更长的段拆成多条
+TABLE_MAX_MS = 0xFFFF
+
+
+class WinsoundConverter:
+    """不依赖图形界面的转换核心：加载 → 分析 → 分段 → 生成代码"""
+
+    def __init__(self, log_callback=None, progress_callback=None, cache=None):
+        """progress_callback(event) 收到 progress.ProgressEvent，包含阶段、已完成/总工作量、吞吐量和剩余时间"""
+        self.log_callback = log_callback
+        self.progress_callback = progress_callback
+        self.progress = ProgressTracker(progress_callback)
+        # 最近一次转换的各阶段耗时
+        self.timer = StageTimer()
+        self.cache = cache
+        self.function_counter = 0
+
+    def log(self, message):
+        """输出日志消息，未指定回调时直接打印"""
+        if self.log_callback is not None:
+            self.log_callback(message)
+        else:
+            print(message)
+
+    def load_audio(self, mp3_file, sr=ANALYSIS_SR):
+        """解码为单声道 float32 并重采样到 sr，返回 (y, sr)
+
+        先用 soundfile 原生解码(分块读取以便汇报进度)，不支持的格式再交给 audioread，
+        见 decoder.py。文件名可以包含中文等任意字符。
+        """
+        with self.timer.span('decode'):
+            y, native_sr, backend = decode_native(mp3_file, progress=self.progress)
+        with self.timer.span('resample'):
+            y = resample(y, native_sr, sr)
+        self.progress.finish_stage()
+        self.timer.info['decoder'] = backend
+        return y, sr
+
+    def analyze_frequencies(self, y, sr, hop_length=HOP_LENGTH, n_fft=N_FFT, chunk_frames=STFT_CHUNK_FRAMES, engine=DEFAULT_ENGINE, band=None):
+        """分析音频的主要频率，返回 (逐帧频率, 帧时间, 显示用的缩小频谱)
+
+        STFT按帧分块计算，结果与整体调用 librosa.stft 相同，但不必同时保存整个复数矩阵，
+        并且每块完成后都能汇报进度。频谱图直接复用这里的幅度谱，可视化阶段无需再做一次STFT。
+        engine 为 'goertzel'(或 band.py 中的其他频带方法)时只计算 band=(fmin, fmax) 频带内的频谱(见 band.py)，频谱图也只含该频带；
+        band 为 None 时 STFT 在人耳可听范围内取峰值，频带引擎使用 DEFAULT_BAND。
+        """
+        self.log("正在分析音频频率...")
+        
+        # 获取频率和时间轴(帧数与 librosa.stft(center=True) 相同)
+        n_frames = 1 + len(y) // hop_length
+        if engine == 'stft':
+            analyzer = None
+            fmin, fmax = band or (MIN_AUDIBLE_FREQ, MAX_AUDIBLE_FREQ)
+            freqs = librosa.fft_frequencies(sr=sr, n_fft=n_fft)
+        else:
+            fmin, fmax = band or DEFAULT_BAND
+            analyzer = BandAnalyzer(sr, n_fft, fmin, fmax, engine)
+            freqs = analyzer.freqs
+            self.log(f"频带分析({engine}): {fmin:g}-{fmax:g}Hz，{len(freqs)} 个频点")
+        times = librosa.frames_to_time(np.arange(n_frames), sr=sr, hop_length=hop_length)
+        
+        # 每块的帧数取缩小步长的整数倍，逐块缩小的频谱与整体缩小相同
+        row_step, col_step = spectrogram_steps(len(freqs), n_frames)
+        chunk_frames = max(1, chunk_frames // col_step) * col_step
+        
+        # 与 center=True 相同的两端补零，之后每块按 center=False 计算
+        padded = np.pad(y, n_fft // 2)
+        main_freqs = np.empty(n_frames, dtype=np.float64)
+        pooled = []
+        self.progress.start_stage('analysis', n_frames, "帧")
+        for start in range(0, n_frames, chunk_frames):
+            stop = min(start + chunk_frames, n_frames)
+            chunk = padded[start * hop_length:(stop - 1) * hop_length + n_fft]
+            if analyzer is None:
+                with self.timer.span('stft'):
+                    magnitude = np.abs(librosa.stft(chunk, n_fft=n_fft, hop_length=hop_length, center=False))
+            else:
+                with self.timer.span('band_analysis'):
+                    magnitude = analyzer.magnitude(frame_view(chunk, n_fft, hop_length))
+            # 对整块幅度矩阵求每帧在频带内的主要频率
+            with self.timer.span('peak_picking'):
+                main_freqs[start:stop] = dominant_frequencies(magnitude, freqs, fmin, fmax)
+            with self.timer.span('spectrogram'):
+                pooled.append(pool_spectrogram(magnitude, row_step, col_step))
+            self.progress.update(stop)
+        self.progress.finish_stage()
+        
+        spectrogram = {
+            'magnitude': np.concatenate(pooled, axis=1),
+            'freqs': freqs[::row_step],
+            'times': times[::col_step],
+        }
+        
+        self.log(f"分析完成，共{len(main_freqs)}个频率点")
+        return main_freqs, times, spectrogram
+
+    def merge_short_segments(self, frequencies, times, min_duration):
+        """合并持续时间过短的音频段"""
+        self.log(f"正在合并短于{min_duration}秒的音频段...")
+        
+        merged_freqs, merged_durations = segmentation.merge_short_segments(frequencies, times, min_duration)
+        
+        self.log(f"合并完成，从{len(frequencies)}个段合并为{len(merged_freqs)}个段")
+        return merged_freqs, merged_durations
+
+    def process_dynamic_segments(self, frequencies, times, min_duration, freq_threshold):
+        """处理动态持续时间的音频段"""
+        self.log(f"正在处理动态音频段，最短时间{min_duration}秒，频率阈值{freq_threshold}Hz...")
+        
+        processed_freqs, processed_durations = segmentation.process_dynamic_segments(
+            frequencies, times, min_duration, freq_threshold
+        )
+        
+        self.log(f"动态处理完成，生成{len(processed_freqs)}个音频段")
+        return processed_freqs, processed_durations
+
+    def process_auto_detection(self, frequencies, times, min_duration, freq_threshold, low_freq_threshold):
+        """自动检测模式处理音频段"""
+        self.log(f"正在进行自动检测处理，最短时间{min_duration}秒，频率阈值{freq_threshold}Hz，低频阈值{low_freq_threshold}Hz...")
+        
+        processed_freqs, processed_durations, processed_types = segmentation.process_auto_detection(
+            frequencies, times, min_duration, freq_threshold, low_freq_threshold
+        )
+        
+        self.log(f"自动检测完成，生成{len(processed_freqs)}个音频段")
+        return processed_freqs, processed_durations, processed_types
+
+    def load_and_analyze(self, mp3_file, preset=DEFAULT_PRESET, engine=DEFAULT_ENGINE, band=None, analyze=True):
+        """按分析预设和分析引擎加载音频并分析逐帧频率，命中缓存时跳过解码和STFT
+
+        analyze 为False时未命中缓存只解码，逐帧频率为空、频谱为None，结果不写入缓存。
+        """
+        preset = get_preset(preset)
+        cache_key = None
+        if self.cache is not None:
+            variant = engine if band is None else f"{engine}_{band[0]:g}-{band[1]:g}"
+            cache_key = self.cache.key(mp3_file, preset.sr, preset.hop_length, preset.n_fft, variant)
+            entry = self.cache.get(cache_key)
+            if entry is not None:
+                self.log("命中分析缓存，跳过解码和频率分析")
+                self.timer.info['cache_hit'] = True
+                return entry['y'], entry['sr'], entry['frequencies'], entry['times'], entry['spectrogram']
+        
+        self.log("开始加载音频文件...")
+        
+        # 加载音频文件
+        y, sr = self.load_audio(mp3_file, preset.sr)
+        self.log(f"音频加载完成，采样率: {sr} Hz，时长: {len(y)/sr:.2f} 秒")
+        if not analyze:
+            return y, sr, [], [], None
+        
+        # 分析频率
+        frequencies, times, spectrogram = self.analyze_frequencies(y, sr, preset.hop_length, preset.n_fft,
+                                                                   engine=engine, band=band)
+        
+        if cache_key is not None:
+            self.cache.put(cache_key, y, sr, frequencies, times, spectrogram)
+        
+        return y, sr, frequencies, times, spectrogram
+
+    def process_segments(self, frequencies, times, y, sr, mp3_file=None, fixed_duration=None, min_duration=0.1, freq_threshold=50.0, low_freq_threshold=100.0, use_dynamic=False, use_auto_detection=False, use_streaming=False):
+        """根据模式把逐帧频率处理成音频段，返回 (频率, 持续时间, 类型)
+
+        只依赖分析结果，调整阈值后可以直接重新调用而无需重新解码和分析。
+        """
+        if use_auto_detection or use_dynamic:
+            self.progress.start_stage('segmentation', len(frequencies), "帧")
+        if use_auto_detection:
+            processed_freqs, processed_durations, processed_types = self.process_auto_detection(
+                frequencies, times, min_duration, freq_threshold, low_freq_threshold
+            )
+        elif use_dynamic:
+            processed_freqs, processed_durations = self.process_dynamic_segments(
+                frequencies, times, min_duration, freq_threshold
+            )
+            processed_types = ['beep'] * len(processed_freqs)  # 动态模式全部使用beep
+        else:
+            # 固定模式
+            processed_freqs, processed_durations = [], []
+            if fixed_duration and use_streaming:
+                # 流式固定模式的解码也在这一阶段，按已读取的采样数汇报
+                info = audio_info(mp3_file)
+                self.progress.start_stage('segmentation', info.frames, "采样", span=(0, 80))
+                blocks = []
+                done = 0
+                for block in stream_fixed_segments(mp3_file, fixed_duration):
+                    blocks.append(block)
+                    done += int(round(np.sum(block[1]) * info.samplerate))
+                    self.progress.update(done)
+                if blocks:
+                    processed_freqs = np.concatenate([block_freqs for block_freqs, _ in blocks])
+                    processed_durations = np.concatenate([block_durations for _, block_durations in blocks])
+            elif fixed_duration:
+                # 一次性切段并批量计算每段的主要频率
+                segment_length = int(round(fixed_duration * sr))
+                self.progress.start_stage('segmentation', len(y) // max(1, segment_length), "段")
+                processed_freqs, processed_durations = fixed_segment_frequencies(
+                    y, sr, fixed_duration, on_chunk=self.progress.update
+                )
+            
+            processed_types = ['beep'] * len(processed_freqs)  # 固定模式全部使用beep
+        
+        self.progress.finish_stage()
+        return processed_freqs, processed_durations, processed_types
+
+    def mp3_to_winsound(self, mp3_file, output_file=None, function_name=None, fixed_duration=None, min_duration=0.1, freq_threshold=50.0, low_freq_threshold=100.0, use_dynamic=False, use_auto_detection=False, use_streaming=False, preset=DEFAULT_PRESET, engine=DEFAULT_ENGINE, band=None, output_format=DEFAULT_OUTPUT_FORMAT, coalesce=True, analyze=None):
+        """将MP3文件转换为使用winsound.beep播放的Python代码
+
+        preset 为分析预设名(draft/standard/precise)，开始前在日志中显示预计帧数和计算量。
+        engine/band 选择分析引擎和频带(见 analyze_frequencies)；流式模式始终使用STFT，只按 band 限制取峰范围。
+        output_format 为生成代码的格式，coalesce 为是否合并相邻的相同调用(见 generate_python_code)。
+        analyze 为是否做逐帧频率分析，None 时只有动态和自动模式分析，固定模式只解码(命中缓存时仍返回缓存的分析结果)。
+        出错时直接抛出异常，成功时返回包含输出文件、生成代码和分段结果的字典。
+        各阶段耗时记录在 self.timer 中，摘要写入日志，JSON报告保存在输出文件旁边。
+        """
+        analysis_preset = get_preset(preset)
+        if engine not in ENGINES:
+            raise ValueError(f"未知的分析引擎: {engine}，可选: {', '.join(ENGINES)}")
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"未知的输出格式: {output_format}，可选: {', '.join(OUTPUT_FORMATS)}")
+        self.timer = StageTimer()
+        # 如果未指定函数名，则使用main或main_xx格式
+        if function_name is None:
+            if self.function_counter == 0:
+                function_name = "main"
+            else:
+                function_name = f"main_{self.function_counter:02d}"
+            self.function_counter += 1
+        
+        # 如果未指定输出文件，则使用与输入文件相同的名称但扩展名为.py
+        if output_file is None:
+            output_file = os.path.splitext(mp3_file)[0] + "_winsound.py"
+        
+        try:
+            info = audio_info(mp3_file)
+        except RuntimeError:
+            # soundfile 不支持的格式解码前无法得知时长
+            info = None
+        input_duration = info.duration if info is not None else None
+        if analyze is None:
+            analyze = use_dynamic or use_auto_detection
+        # 固定模式默认不做STFT；流式模式按原始采样率分析
+        if info is not None and (use_dynamic or use_auto_detection or (analyze and not use_streaming)):
+            shown = analysis_preset._replace(sr=info.samplerate) if use_streaming else analysis_preset
+            self.log(format_estimate(shown, input_duration))
+        
+        if use_streaming:
+            # 流式模式：分块解码，不把整个文件及其STFT同时放入内存(使用原始采样率，只采用预设的帧长和帧移)
+            self.log("开始流式分析音频文件...")
+            if info is None:
+                # 流式模式只支持 soundfile 能读取的格式，再读一次以抛出原始错误
+                info = audio_info(mp3_file)
+            y = None
+            sr = None
+            spectrogram = None
+            frequencies, times = [], []
+            if use_dynamic or use_auto_detection:
+                # 流式模式边解码边分析，两者合为一个阶段
+                n_fft, hop_length = analysis_preset.n_fft, analysis_preset.hop_length
+                self.progress.start_stage('analysis', max(0, 1 + (info.frames - n_fft) // hop_length), "帧", span=(0, 50))
+                done = [0]
+                
+                def on_block(block_freqs, block_times):
+                    done[0] += len(block_freqs)
+                    self.progress.update(done[0])
+                    self.log(f"已分析至 {block_times[-1]:.1f} 秒")
+                
+                with self.timer.span('streaming_analysis'):
+                    frequencies, times = analyze_stream(mp3_file, n_fft, hop_length, on_block=on_block,
+                                                        band=band or (MIN_AUDIBLE_FREQ, MAX_AUDIBLE_FREQ))
+                self.progress.finish_stage()
+                self.log(f"流式分析完成，共{len(frequencies)}个频率点")
+        else:
+            y, sr, frequencies, times, spectrogram = self.load_and_analyze(mp3_file, preset, engine, band, analyze)
+        
+        # 根据模式处理音频段
+        with self.timer.span('segmentation'):
+            processed_freqs, processed_durations, processed_types = self.process_segments(
+                frequencies, times, y, sr, mp3_file, fixed_duration, min_duration, freq_threshold,
+                low_freq_threshold, use_dynamic, use_auto_detection, use_streaming
+            )
+        
+        # 生成Python代码
+        self.log("正在生成Python代码...")
+        with self.timer.span('codegen'):
+            python_code = self.generate_python_code(processed_freqs, processed_durations, processed_types if use_auto_detection else None, function_name, mp3_file, output_format, coalesce)
+        
+        # 保存到文件
+        with self.timer.span('write'):
+            with open(output_file, 'w', encoding='utf-8') as f:
+                f.write(python_code)
+        
+        self.log(f"Python代码已保存到: {output_file}")
+        
+        self.timer.info.update(
+            input_file=os.path.basename(mp3_file),
+            input_duration=len(y) / sr if y is not None else input_duration,
+            preset=analysis_preset.name,
+            engine='stft' if use_streaming else engine,
+            output_format=output_format,
+            frames=len(frequencies),
+            segments=len(processed_freqs),
+            streaming=use_streaming,
+        )
+        self.write_timing_report(output_file)
+        
+        return {
+            'output_file': output_file,
+            'function_name': function_name,
+            'python_code': python_code,
+            'y': y,
+            'sr': sr,
+            'frequencies': processed_freqs,
+            'durations': processed_durations,
+            'types': processed_types,
+            'analysis_frequencies': frequencies,
+            'analysis_times': times,
+            'spectrogram': spectrogram,
+            'timer': self.timer,
+        }
+
+    def write_timing_report(self, output_file, timer=None):
+        """把耗时摘要写入日志，并在输出文件旁边保存JSON报告(写入失败不影响转换)"""
+        timer = timer or self.timer
+        for line in timer.summary_lines():
+            self.log(line)
+        try:
+            timer.write_json(report_path(output_file))
+        except OSError as e:
+            self.log(f"耗时报告保存失败: {str(e)}")
+
+    def generate_python_code(self, frequencies, durations, types=None, function_name="main", original_file="", output_format=DEFAULT_OUTPUT_FORMAT, coalesce=True):
+        """生成Python播放代码
+
+        output_format='statements': 每段一行 winsound.Beep/time.sleep，便于阅读和手工修改；
+        output_format='table': 把 (频率, 毫秒) 序列打包为 uint16 数组，zlib 压缩后用 base64 写成一个字符串常量，
+        播放函数只是一个短循环，长音频生成的文件小一个数量级，导入时也不必编译数万条语句。
+        coalesce=True 时在频率和毫秒数取整之后合并相邻的相同 Beep 和相邻的 sleep(见 segmentation.coalesce_calls)，
+        并在日志中报告调用次数减少了多少。
+        """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"未知的输出格式: {output_format}，可选: {', '.join(OUTPUT_FORMATS)}")
+        freqs, ms = segmentation.playback_calls(frequencies, durations, types)
+        segment_calls = len(freqs)
+        if coalesce:
+            freqs, ms = segmentation.coalesce_calls(freqs, ms)
+            if segment_calls:
+                self.log(f"合并相邻的相同调用: {segment_calls} → {len(freqs)} 次，"
+                         f"减少 {(segment_calls - len(freqs)) / segment_calls:.1%}")
+        
+        code_lines = []
+        code_lines.append("import winsound")
+        code_lines.append("import time")
+        if output_format == 'table':
+            code_lines.append("import base64")
+            code_lines.append("import sys")
+            code_lines.append("import zlib")
+            code_lines.append("from array import array")
+        code_lines.append("")
+        code_lines.append(f"# 从文件生成: {os.path.basename(original_file)}")
+        code_lines.append(f"# 音调数量: {len(frequencies)}")
+        if coalesce:
+            code_lines.append(f"# 播放调用: {len(freqs)} 次(合并相邻的相同调用前 {segment_calls} 次)")
+        code_lines.append(f"# 总时长: {sum(durations):.2f} 秒")
+        code_lines.append("")
+        
+        if output_format == 'table':
+            code_lines.extend(self.table_code_lines(freqs, ms, function_name))
+        else:
+            code_lines.append(f"def {function_name}():")
+            code_lines.append("    \"\"\"播放转换后的音频\"\"\"")
+            
+            self.progress.start_stage('codegen', len(freqs), "段")
+            for i, (freq, duration_ms) in enumerate(zip(freqs.tolist(), ms.tolist())):
+                if i % CODEGEN_REPORT_EVERY == 0:
+                    self.progress.update(i)
+                if freq == 0:
+                    code_lines.append(f"    time.sleep({duration_ms / 1000:.3f})  # 低频段，使用静音")
+                else:
+                    code_lines.append(f"    winsound.Beep({freq}, {duration_ms})")
+            
+            self.progress.finish_stage()
+        
+        code_lines.append("")
+        code_lines.append("if __name__ == '__main__':")
+        code_lines.append(f"    {function_name}()")
+        
+        return "\n".join(code_lines)
+
+    def table_code_lines(self, freqs, ms, function_name):
+        """table 格式的数据常量和播放函数，freqs/ms 为 segmentation.playback_calls 的结果
+
+        每次调用一条 (频率, 毫秒) 记录，频率为0表示静音；超过 TABLE_MAX_MS 的调用拆成多条。
+        数组按小端序打包，播放时在大端机器上先交换字节序。
+        """
+        self.progress.start_stage('codegen', len(freqs), "段")
+        # 拆分超长的调用(静音可能为0毫秒，也占一条记录)
+        repeats = np.maximum(1, -(-ms // TABLE_MAX_MS))
+        records = np.empty((int(repeats.sum()), 2), dtype='<u2')
+        records[:, 0] = np.repeat(freqs, repeats)
+        records[:, 1] = TABLE_MAX_MS
+        # 每次调用的最后一条记录放余下的毫秒数
+        records[np.cumsum(repeats) - 1, 1] = ms - (repeats - 1) * TABLE_MAX_MS
+        self.progress.update(len(freqs))
+        
+        blob = base64.b64encode(zlib.compress(records.tobytes(), 9)).decode('ascii')
+        code_lines = [f"# (频率, 毫秒) 记录的 uint16 小端数组(zlib 压缩)，频率为0表示静音，共 {len(records)} 条", "TABLE = ("]
+        for start in range(0, len(blob), TABLE_LINE_WIDTH):
+            code_lines.append(f"    \"{blob[start:start + TABLE_LINE_WIDTH]}\"")
+        code_lines.append(")")
+        code_lines.append("")
+        code_lines.append(f"def {function_name}():")
+        code_lines.append("    \"\"\"播放转换后的音频\"\"\"")
+        code_lines.append("    table = array('H', zlib.decompress(base64.b64decode(TABLE)))")
+        code_lines.append("    if sys.byteorder == 'big':")
+        code_lines.append("        table.byteswap()")
+        code_lines.append("    beep, sleep = winsound.Beep, time.sleep")
+        code_lines.append("    for i in range(0, len(table), 2):")
+        code_lines.append("        if table[i]:")
+        code_lines.append("            beep(table[i], table[i + 1])")
+        code_lines.append("        else:")
+        code_lines.append("            sleep(table[i + 1] / 1000)")
+        
+        self.progress.finish_stage()
+        return code_lines
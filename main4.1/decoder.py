@@ -0,0 +1,116 @@
+from collections import namedtuple
+from contextlib import contextmanager
+
+import audioread
+import librosa
+import numpy as np
+import soundfile as sf
+
+from progress import ProgressTracker
+
+# 所有后端共用的重采样器(librosa 默认的 soxr 高质量模式，比 kaiser 窗快一个数量级以上)
+RESAMPLE_TYPE = 'soxr_hq'
+# 分块解码时每块的采样数，用于汇报进度
+DECODE_BLOCK_FRAMES = 256 * 1024
+
+# name: 注册名; description: 说明; decode(path, progress) -> (单声道 float32 数组, 原始采样率)
+DecoderBackend = namedtuple('DecoderBackend', ['name', 'description', 'decode'])
+AudioInfo = namedtuple('AudioInfo', ['samplerate', 'frames', 'channels', 'duration'])
+
+
+@contextmanager
+def open_soundfile(path):
+    """用 soundfile 打开音频文件
+
+    路径由 Python 打开后把文件对象交给 libsndfile，因此文件名可以包含中文等任意 Unicode 字符
+    (libsndfile 按路径打开时在 Windows 上只支持当前代码页)。
+    """
+    with open(path, 'rb') as raw, sf.SoundFile(raw) as f:
+        yield f
+
+
+def audio_info(path):
+    """返回 AudioInfo(采样率, 采样数, 声道数, 时长)，soundfile 不支持的格式抛出 RuntimeError"""
+    with open_soundfile(path) as f:
+        return AudioInfo(f.samplerate, f.frames, f.channels, f.frames / f.samplerate)
+
+
+def iter_mono_blocks(path, blocksize):
+    """分块读取为单声道 float32，产出 (数组, 采样率)，不把整个文件读入内存"""
+    with open_soundfile(path) as f:
+        for block in f.blocks(blocksize=blocksize, dtype='float32', always_2d=True):
+            yield block.mean(axis=1), f.samplerate
+
+
+def decode_soundfile(path, progress):
+    """libsndfile 原生解码 WAV/FLAC/OGG/MP3，分块读取并按采样数汇报进度"""
+    with open_soundfile(path) as f:
+        progress.start_stage('decode', f.frames, "采样")
+        blocks = []
+        done = 0
+        for block in f.blocks(blocksize=DECODE_BLOCK_FRAMES, dtype='float32', always_2d=True):
+            blocks.append(block.mean(axis=1))
+            done += len(block)
+            progress.update(done)
+        y = np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
+        return y, f.samplerate
+
+
+def decode_audioread(path, progress):
+    """用 audioread(ffmpeg、GStreamer 等系统解码器)解码 soundfile 不支持的格式，按已解码的时长汇报进度"""
+    with audioread.audio_open(path) as f:
+        native_sr, channels = f.samplerate, f.channels
+        progress.start_stage('decode', f.duration, "秒")
+        blocks = []
+        done = 0
+        for buf in f:
+            block = librosa.util.buf_to_float(buf, dtype=np.float32)
+            blocks.append(block)
+            done += len(block)
+            progress.update(done / channels / native_sr)
+    y = np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
+    if channels > 1:
+        y = y.reshape(-1, channels).mean(axis=1)
+    return y, native_sr
+
+
+# 按顺序尝试，前面的后端不支持该格式(抛出 RuntimeError)时换下一个
+BACKENDS = {
+    backend.name: backend for backend in (
+        DecoderBackend('soundfile', "libsndfile 原生解码(WAV/FLAC/OGG/MP3)", decode_soundfile),
+        DecoderBackend('audioread', "audioread(其他格式，需要 ffmpeg 等系统解码器)", decode_audioread),
+    )
+}
+
+
+def get_backend(name):
+    """按名称取得解码后端，名称不存在时抛出 ValueError"""
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"未知的解码后端: {name}，可选: {', '.join(BACKENDS)}") from None
+
+
+def decode_native(path, backends=None, progress=None):
+    """依次尝试各后端解码为原始采样率的单声道 float32，返回 (y, 原始采样率, 使用的后端名)"""
+    progress = progress or ProgressTracker(None)
+    names = list(backends or BACKENDS)
+    for name in names[:-1]:
+        try:
+            return get_backend(name).decode(path, progress) + (name,)
+        except RuntimeError:
+            continue
+    return get_backend(names[-1]).decode(path, progress) + (names[-1],)
+
+
+def resample(y, orig_sr, target_sr):
+    """重采样为 target_sr 的 float32，采样率相同时直接返回"""
+    if orig_sr == target_sr:
+        return y.astype(np.float32, copy=False)
+    return librosa.resample(y, orig_sr=orig_sr, target_sr=target_sr, res_type=RESAMPLE_TYPE).astype(np.float32, copy=False)
+
+
+def decode(path, sr, backends=None, progress=None):
+    """解码为 sr 采样率的单声道 float32，返回 (y, sr, 使用的后端名)"""
+    y, native_sr, name = decode_native(path, backends, progress)
+    return resample(y, native_sr, sr), sr, name
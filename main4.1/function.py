@@ -1,23 +1,84 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import librosa
-import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import threading
 import time
 import os
-import soundfile as sf
+from batch import batch_convert, collect_audio_files
+from presets import DEFAULT_BAND, DEFAULT_ENGINE, DEFAULT_OUTPUT_FORMAT, DEFAULT_PRESET, ENGINES, OUTPUT_FORMATS, PRESETS
+from progress import format_progress
+from timing import report_path
+from ui_channel import DEFAULT_FPS, UIChannel
+from worker import WorkerUnavailable, submit
+
+# librosa、matplotlib 等导入较慢的模块在窗口显示后由后台线程加载(见 import_heavy_modules)
+librosa = np = plt = FigureCanvasTkAgg = NavigationToolbar2Tk = None
+downsample_spectrogram = AnalysisCache = WinsoundConverter = WaveformPyramid = None
+HOP_LENGTH = N_FFT = None
+
+
+def import_heavy_modules():
+    """导入耗时较长的模块并填入本模块的全局变量，返回用时(秒)"""
+    global librosa, np, plt, FigureCanvasTkAgg, NavigationToolbar2Tk
+    global downsample_spectrogram, AnalysisCache, WinsoundConverter, WaveformPyramid, HOP_LENGTH, N_FFT
+    start = time.perf_counter()
+    import librosa
+    import librosa.display
+    import numpy as np
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+    from analysis import downsample_spectrogram
+    from cache import AnalysisCache
+    from converter import HOP_LENGTH, N_FFT, WinsoundConverter
+    from waveform import WaveformPyramid
+    return time.perf_counter() - start
+
 
 class MP3ToWinsoundApp(tk.Tk):
     def __init__(self):
         super().__init__()
-        self.title("MP3到Winsound.Beep转换器(此版本mp3格式文件名必须用英文，不然报错！)")
+        self.title("MP3到Winsound.Beep转换器")
         self.geometry("800x600")
         self.mp3_file = None
+        self.batch_files = []
         self.output_file = None
-        self.function_counter = 0
+        # 最近一次分析结果，调整阈值时只重新分段
+        self.last_analysis = None
+        self.resegment_job = None
+        self.resegment_generation = 0
+        # 转换器在后台加载完依赖模块后创建
+        self.cache = None
+        self.converter = None
+        self.preview_converter = None
+        # 当前文件的波形包络金字塔，每个文件只计算一次
+        self.waveform_pyramid = None
+        # 工作线程通过它向界面线程发送日志、进度和控件更新
+        self.ui_channel = UIChannel()
         self.setup_ui()
+        self.poll_ui_channel()
+        
+        # 先显示窗口，依赖模块加载完成后再启用"开始转换"
+        self.enable_buttons(False)
+        self.log("正在后台加载 librosa、matplotlib...")
+        threading.Thread(target=self.load_modules, daemon=True).start()
+
+    def load_modules(self):
+        """在后台线程中加载依赖模块"""
+        try:
+            elapsed = import_heavy_modules()
+        except Exception as e:
+            self.log(f"加载依赖模块失败: {str(e)}")
+            self.ui_channel.call(messagebox.showerror, "错误", f"加载依赖模块失败: {str(e)}")
+            return
+        self.ui_channel.call(self.on_modules_loaded, elapsed)
+
+    def on_modules_loaded(self, elapsed):
+        """依赖模块加载完成：创建转换器并启用转换按钮"""
+        self.cache = AnalysisCache()
+        self.converter = WinsoundConverter(log_callback=self.log, progress_callback=self.on_progress, cache=self.cache)
+        # 与转换共用分析缓存，重新分段时补做的分析也会被之后的转换复用
+        self.preview_converter = WinsoundConverter(log_callback=lambda message: None, cache=self.cache)
+        self.enable_buttons(True)
+        self.log(f"依赖模块加载完成，用时 {elapsed:.2f} 秒")
 
     def setup_ui(self):
         # 主框架
@@ -29,6 +90,7 @@ class MP3ToWinsoundApp(tk.Tk):
         file_frame.pack(fill=tk.X, pady=(0, 10))
         
         ttk.Button(file_frame, text="选择MP3文件", command=self.select_mp3_file).pack(side=tk.LEFT, padx=5, pady=5)
+        ttk.Button(file_frame, text="选择文件夹(批量)", command=self.select_folder).pack(side=tk.LEFT, padx=5, pady=5)
         self.file_label = ttk.Label(file_frame, text="未选择文件")
         self.file_label.pack(side=tk.LEFT, padx=10, pady=5)
         
@@ -45,6 +107,10 @@ class MP3ToWinsoundApp(tk.Tk):
         ttk.Radiobutton(mode_frame, text="单线程", variable=self.mode_var, value="single").pack(side=tk.LEFT, padx=10)
         ttk.Radiobutton(mode_frame, text="多线程", variable=self.mode_var, value="multi").pack(side=tk.LEFT)
         
+        ttk.Label(mode_frame, text="进程数:").pack(side=tk.LEFT, padx=(20, 0))
+        self.workers_var = tk.IntVar(value=os.cpu_count() or 1)
+        ttk.Entry(mode_frame, textvariable=self.workers_var, width=5).pack(side=tk.LEFT, padx=5)
+        
         # 持续时间模式选择
         duration_mode_frame = ttk.Frame(options_frame)
         duration_mode_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -55,6 +121,40 @@ class MP3ToWinsoundApp(tk.Tk):
         ttk.Radiobutton(duration_mode_frame, text="动态持续时间", variable=self.duration_mode_var, value="dynamic", command=self.on_duration_mode_change).pack(side=tk.LEFT, padx=10)
         ttk.Radiobutton(duration_mode_frame, text="自动检测", variable=self.duration_mode_var, value="auto", command=self.on_duration_mode_change).pack(side=tk.LEFT)
         
+        # 分析预设(采样率、n_fft、hop)
+        preset_frame = ttk.Frame(options_frame)
+        preset_frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        ttk.Label(preset_frame, text="分析预设:").pack(side=tk.LEFT)
+        self.preset_var = tk.StringVar(value=DEFAULT_PRESET)
+        ttk.Combobox(preset_frame, textvariable=self.preset_var, values=list(PRESETS), state="readonly", width=10).pack(side=tk.LEFT, padx=5)
+        self.preset_label = ttk.Label(preset_frame, text=PRESETS[DEFAULT_PRESET].description)
+        self.preset_label.pack(side=tk.LEFT, padx=10)
+        self.preset_var.trace_add('write', lambda *args: self.preset_label.config(text=PRESETS[self.preset_var.get()].description))
+        
+        ttk.Label(preset_frame, text="输出格式:").pack(side=tk.LEFT, padx=(20, 0))
+        self.output_format_var = tk.StringVar(value=DEFAULT_OUTPUT_FORMAT)
+        ttk.Combobox(preset_frame, textvariable=self.output_format_var, values=list(OUTPUT_FORMATS), state="readonly", width=10).pack(side=tk.LEFT, padx=5)
+        ttk.Label(preset_frame, text="(table: 压缩常量表，适合长音频)").pack(side=tk.LEFT)
+        self.coalesce_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(preset_frame, text="合并相邻的相同调用", variable=self.coalesce_var).pack(side=tk.LEFT, padx=10)
+        
+        # 分析引擎和频带(频带为空时使用各引擎的默认值)
+        band_frame = ttk.Frame(options_frame)
+        band_frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        ttk.Label(band_frame, text="分析引擎:").pack(side=tk.LEFT)
+        self.engine_var = tk.StringVar(value=DEFAULT_ENGINE)
+        ttk.Combobox(band_frame, textvariable=self.engine_var, values=list(ENGINES), state="readonly", width=10).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Label(band_frame, text="频带(Hz):").pack(side=tk.LEFT, padx=(20, 0))
+        self.band_min_var = tk.StringVar(value="")
+        ttk.Entry(band_frame, textvariable=self.band_min_var, width=8).pack(side=tk.LEFT, padx=5)
+        ttk.Label(band_frame, text="-").pack(side=tk.LEFT)
+        self.band_max_var = tk.StringVar(value="")
+        ttk.Entry(band_frame, textvariable=self.band_max_var, width=8).pack(side=tk.LEFT, padx=5)
+        ttk.Label(band_frame, text=f"(留空: stft 为 20-20000，goertzel 为 {DEFAULT_BAND[0]:g}-{DEFAULT_BAND[1]:g})").pack(side=tk.LEFT)
+        
         # 固定持续时间设置
         self.fixed_duration_frame = ttk.Frame(options_frame)
         self.fixed_duration_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -99,6 +199,12 @@ class MP3ToWinsoundApp(tk.Tk):
         self.show_spectrogram_var = tk.BooleanVar(value=True)
         ttk.Checkbutton(viz_frame, text="显示频谱图", variable=self.show_spectrogram_var).pack(side=tk.LEFT, padx=20)
         
+        self.streaming_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(viz_frame, text="流式分析(适合长文件，不生成可视化)", variable=self.streaming_var).pack(side=tk.LEFT)
+        
+        self.use_worker_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(viz_frame, text="使用常驻分析进程(worker.py)", variable=self.use_worker_var).pack(side=tk.LEFT)
+        
         # 按钮区域
         button_frame = ttk.Frame(options_frame)
         button_frame.pack(fill=tk.X, padx=5, pady=10)
@@ -106,10 +212,15 @@ class MP3ToWinsoundApp(tk.Tk):
         self.convert_button = ttk.Button(button_frame, text="开始转换", command=self.start_conversion)
         self.convert_button.pack(side=tk.LEFT, padx=5)
         
+        self.segment_count_label = ttk.Label(button_frame, text="音频段: -")
+        self.segment_count_label.pack(side=tk.LEFT, padx=20)
+        
         # 进度条
         self.progress_var = tk.DoubleVar()
         self.progress_bar = ttk.Progressbar(main_frame, variable=self.progress_var, maximum=100)
-        self.progress_bar.pack(fill=tk.X, pady=(0, 10))
+        self.progress_bar.pack(fill=tk.X)
+        self.progress_label = ttk.Label(main_frame, text="")
+        self.progress_label.pack(fill=tk.X, pady=(0, 10))
         
         # 创建选项卡
         self.notebook = ttk.Notebook(main_frame)
@@ -141,6 +252,12 @@ class MP3ToWinsoundApp(tk.Tk):
         
         # 初始化时隐藏动态和自动检测设置
         self.on_duration_mode_change()
+        
+        # 参数变化时实时重新分段
+        for var in (self.duration_mode_var, self.fixed_duration_var, self.min_duration_var, self.freq_threshold_var,
+                    self.auto_min_duration_var, self.auto_freq_threshold_var, self.low_freq_threshold_var,
+                    self.output_format_var, self.coalesce_var):
+            var.trace_add('write', self.schedule_resegment)
 
     def on_duration_mode_change(self):
         """根据选择的持续时间模式显示相应的设置"""
@@ -160,13 +277,31 @@ class MP3ToWinsoundApp(tk.Tk):
             self.auto_detection_frame.pack(fill=tk.X, padx=5, pady=5)
 
     def log(self, message):
-        """添加日志消息"""
-        import datetime
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-        log_message = f"[{timestamp}] {message}\n"
-        self.log_text.insert(tk.END, log_message)
-        self.log_text.see(tk.END)
-        self.update_idletasks()
+        """添加日志消息，任何线程都可以调用，由界面线程批量显示"""
+        self.ui_channel.log(message)
+
+    def poll_ui_channel(self):
+        """按固定帧率取出工作线程发来的消息并更新界面"""
+        # 先安排下一帧，对话框等模态调用期间日志和进度仍能继续刷新
+        self.after(1000 // DEFAULT_FPS, self.poll_ui_channel)
+        text, progress, calls = self.ui_channel.drain()
+        if text:
+            self.log_text.insert(tk.END, text)
+            self.log_text.see(tk.END)
+        if progress is not None:
+            value, detail = progress
+            self.progress_var.set(value)
+            if detail is not None:
+                self.progress_label.config(text=detail)
+        for func, args in calls:
+            try:
+                func(*args)
+            except Exception as e:
+                self.log(f"更新界面时出错: {str(e)}")
+
+    def on_progress(self, event):
+        """转换器的进度回调(在工作线程中调用)，显示阶段进度、吞吐量和剩余时间"""
+        self.ui_channel.progress(event.percent, format_progress(event))
 
     def select_mp3_file(self):
         """选择MP3文件"""
@@ -176,9 +311,20 @@ class MP3ToWinsoundApp(tk.Tk):
         )
         if file_path:
             self.mp3_file = file_path
+            self.batch_files = []
             self.file_label.config(text=os.path.basename(file_path))
             self.log(f"已选择文件: {file_path}")
 
+    def select_folder(self):
+        """选择文件夹，批量转换其中的所有音频文件"""
+        folder = filedialog.askdirectory(title="选择包含MP3文件的文件夹")
+        if folder:
+            self.batch_files = collect_audio_files([folder])
+            self.mp3_file = None
+            self.mode_var.set("multi")
+            self.file_label.config(text=f"{os.path.basename(folder)} ({len(self.batch_files)}个文件)")
+            self.log(f"已选择文件夹: {folder}，共{len(self.batch_files)}个音频文件")
+
     def enable_buttons(self, enabled=True):
         """启用或禁用按钮"""
         state = tk.NORMAL if enabled else tk.DISABLED
@@ -186,364 +332,225 @@ class MP3ToWinsoundApp(tk.Tk):
 
     def start_conversion(self):
         """开始转换过程"""
-        if not self.mp3_file:
+        if not self.mp3_file and not self.batch_files:
             messagebox.showerror("错误", "请先选择MP3文件")
             return
         
+        # 界面变量只在界面线程中读取，工作线程拿到的是参数的副本
+        try:
+            options = self.get_conversion_options()
+        except (tk.TclError, ValueError):
+            messagebox.showerror("错误", "请输入有效的参数")
+            return
         self.enable_buttons(False)
         self.progress_var.set(0)
+        self.progress_label.config(text="")
         
         # 根据选择的模式进行转换
-        if self.mode_var.get() == "single":
+        if self.mode_var.get() == "single" and self.mp3_file:
             # 单线程转换
-            threading.Thread(target=self.convert_mp3, daemon=True).start()
+            threading.Thread(target=self.convert_mp3, args=(options, self.use_worker_var.get()), daemon=True).start()
         else:
             # 多线程转换
-            threading.Thread(target=self.convert_mp3_multithread, daemon=True).start()
+            threading.Thread(target=self.convert_mp3_multithread, args=(options, self.workers_var.get()), daemon=True).start()
+
+    def get_band(self):
+        """读取频带输入框，两个都为空时返回None，格式错误时抛出 ValueError"""
+        fmin, fmax = self.band_min_var.get().strip(), self.band_max_var.get().strip()
+        if not fmin and not fmax:
+            return None
+        band = (float(fmin), float(fmax))
+        if not 0 < band[0] < band[1]:
+            raise ValueError("频带下限应小于上限且大于0")
+        return band
+
+    def get_conversion_options(self):
+        """根据界面设置生成转换参数"""
+        duration_mode = self.duration_mode_var.get()
+        options = {'use_streaming': self.streaming_var.get(), 'preset': self.preset_var.get(),
+                   'engine': self.engine_var.get(), 'band': self.get_band(), 'output_format': self.output_format_var.get(),
+                   'coalesce': self.coalesce_var.get()}
+        
+        if duration_mode == "fixed":
+            options['fixed_duration'] = self.fixed_duration_var.get()
+        elif duration_mode == "dynamic":
+            options['min_duration'] = self.min_duration_var.get()
+            options['freq_threshold'] = self.freq_threshold_var.get()
+            options['use_dynamic'] = True
+        else:  # auto
+            options['min_duration'] = self.auto_min_duration_var.get()
+            options['freq_threshold'] = self.auto_freq_threshold_var.get()
+            options['low_freq_threshold'] = self.low_freq_threshold_var.get()
+            options['use_auto_detection'] = True
+        return options
 
-    def convert_mp3(self):
-        """转换MP3文件"""
+    def convert_mp3(self, options, use_worker=False):
+        """转换MP3文件(在工作线程中运行，界面更新都经由 ui_channel)"""
         try:
             self.log("开始转换过程...")
             
-            # 获取转换参数
-            duration_mode = self.duration_mode_var.get()
-            
-            if duration_mode == "fixed":
-                fixed_duration = self.fixed_duration_var.get()
-                result = self.mp3_to_winsound(self.mp3_file, fixed_duration=fixed_duration)
-            elif duration_mode == "dynamic":
-                min_duration = self.min_duration_var.get()
-                freq_threshold = self.freq_threshold_var.get()
-                result = self.mp3_to_winsound(self.mp3_file, min_duration=min_duration, freq_threshold=freq_threshold, use_dynamic=True)
-            else:  # auto
-                min_duration = self.auto_min_duration_var.get()
-                freq_threshold = self.auto_freq_threshold_var.get()
-                low_freq_threshold = self.low_freq_threshold_var.get()
-                result = self.mp3_to_winsound(self.mp3_file, min_duration=min_duration, freq_threshold=freq_threshold, low_freq_threshold=low_freq_threshold, use_auto_detection=True)
+            result = self.mp3_to_winsound(self.mp3_file, use_worker=use_worker, **options)
             
             if result:
                 self.log("转换完成！")
-                messagebox.showinfo("成功", "转换完成！")
+                self.ui_channel.call(messagebox.showinfo, "成功", "转换完成！")
             else:
                 self.log("转换失败")
-                messagebox.showerror("错误", "转换失败")
+                self.ui_channel.call(messagebox.showerror, "错误", "转换失败")
                 
         except Exception as e:
             self.log(f"转换过程中出错: {str(e)}")
-            messagebox.showerror("错误", f"转换过程中出错: {str(e)}")
+            self.ui_channel.call(messagebox.showerror, "错误", f"转换过程中出错: {str(e)}")
         finally:
-            self.enable_buttons(True)
-            self.progress_var.set(100)
-
-    def convert_mp3_multithread(self):
-        """多线程转换MP3文件"""
-        # 这里可以实现多线程版本，暂时使用单线程版本
-        self.convert_mp3()
-
-    def analyze_frequencies(self, y, sr, hop_length=512):
-        """分析音频的主要频率"""
-        self.log("正在分析音频频率...")
-        
-        # 计算短时傅里叶变换
-        stft = librosa.stft(y, hop_length=hop_length)
-        magnitude = np.abs(stft)
-        
-        # 获取频率和时间轴
-        freqs = librosa.fft_frequencies(sr=sr)
-        times = librosa.frames_to_time(np.arange(magnitude.shape[1]), sr=sr, hop_length=hop_length)
-        
-        # 找到每个时间帧的主要频率
-        main_freqs = []
-        for i in range(magnitude.shape[1]):
-            # 找到幅度最大的频率
-            max_freq_idx = np.argmax(magnitude[:, i])
-            main_freq = freqs[max_freq_idx]
-            
-            # 限制频率范围在人耳可听范围内
-            if 20 <= main_freq <= 20000:
-                main_freqs.append(main_freq)
-            else:
-                # 如果主频率超出范围，找到范围内幅度最大的频率
-                valid_indices = np.where((freqs >= 20) & (freqs <= 20000))[0]
-                if len(valid_indices) > 0:
-                    valid_magnitudes = magnitude[valid_indices, i]
-                    max_valid_idx = valid_indices[np.argmax(valid_magnitudes)]
-                    main_freqs.append(freqs[max_valid_idx])
-                else:
-                    main_freqs.append(440)  # 默认A4音符
-        
-        self.log(f"分析完成，共{len(main_freqs)}个频率点")
-        return main_freqs, times
-
-    def merge_short_segments(self, frequencies, times, min_duration):
-        """合并持续时间过短的音频段"""
-        self.log(f"正在合并短于{min_duration}秒的音频段...")
-        
-        if len(frequencies) == 0:
-            return [], []
-        
-        merged_freqs = []
-        merged_durations = []
-        
-        current_freq = frequencies[0]
-        current_start_time = times[0] if len(times) > 0 else 0
-        
-        for i in range(1, len(frequencies)):
-            current_time = times[i] if i < len(times) else times[-1] + (times[-1] - times[-2] if len(times) > 1 else 0.1)
-            duration = current_time - current_start_time
-            
-            if duration >= min_duration:
-                merged_freqs.append(current_freq)
-                merged_durations.append(duration)
-                current_freq = frequencies[i]
-                current_start_time = current_time
-            # 如果持续时间太短，继续累积
-        
-        # 处理最后一个段
-        if len(times) > 0:
-            final_duration = times[-1] - current_start_time + (times[-1] - times[-2] if len(times) > 1 else 0.1)
-            if final_duration >= min_duration:
-                merged_freqs.append(current_freq)
-                merged_durations.append(final_duration)
-        
-        self.log(f"合并完成，从{len(frequencies)}个段合并为{len(merged_freqs)}个段")
-        return merged_freqs, merged_durations
-
-    def process_dynamic_segments(self, frequencies, times, min_duration, freq_threshold):
-        """处理动态持续时间的音频段"""
-        self.log(f"正在处理动态音频段，最短时间{min_duration}秒，频率阈值{freq_threshold}Hz...")
-        
-        if len(frequencies) == 0:
-            return [], []
-        
-        processed_freqs = []
-        processed_durations = []
-        
-        i = 0
-        while i < len(frequencies):
-            current_freq = frequencies[i]
-            start_time = times[i] if i < len(times) else 0
-            
-            # 寻找相似频率的连续段
-            j = i + 1
-            while j < len(frequencies):
-                if abs(frequencies[j] - current_freq) <= freq_threshold:
-                    j += 1
-                else:
-                    break
-            
-            # 计算段的持续时间
-            end_time = times[j-1] if j-1 < len(times) else times[-1]
-            duration = end_time - start_time
-            
-            # 如果持续时间足够长，添加到结果中
-            if duration >= min_duration:
-                # 计算平均频率
-                avg_freq = np.mean(frequencies[i:j])
-                processed_freqs.append(avg_freq)
-                processed_durations.append(duration)
-            
-            i = j
-        
-        self.log(f"动态处理完成，生成{len(processed_freqs)}个音频段")
-        return processed_freqs, processed_durations
+            self.ui_channel.call(self.enable_buttons, True)
+            self.ui_channel.progress(100)
 
-    def process_auto_detection(self, frequencies, times, min_duration, freq_threshold, low_freq_threshold):
-        """自动检测模式处理音频段"""
-        self.log(f"正在进行自动检测处理，最短时间{min_duration}秒，频率阈值{freq_threshold}Hz，低频阈值{low_freq_threshold}Hz...")
-        
-        if len(frequencies) == 0:
-            return [], [], []
-        
-        processed_freqs = []
-        processed_durations = []
-        processed_types = []  # 'beep' 或 'sleep'
-        
-        i = 0
-        while i < len(frequencies):
-            current_freq = frequencies[i]
-            start_time = times[i] if i < len(times) else 0
+    def convert_mp3_multithread(self, options, workers=None):
+        """多进程批量转换MP3文件(在工作线程中运行)"""
+        try:
+            mp3_files = self.batch_files or [self.mp3_file]
+            self.log(f"开始批量转换，共{len(mp3_files)}个文件...")
             
-            # 寻找相似频率的连续段
-            j = i + 1
-            total_duration = 0
-            while j < len(frequencies):
-                if abs(frequencies[j] - current_freq) <= freq_threshold:
-                    j += 1
-                else:
-                    break
+            results = self.play_mp3_with_threads(mp3_files, options, workers=workers)
+            failed = [result for result in results if not result['ok']]
             
-            # 计算段的持续时间
-            if j-1 < len(times):
-                end_time = times[j-1]
-                total_duration = end_time - start_time
+            summary = f"批量转换结束: 成功 {len(results) - len(failed)} 个，失败 {len(failed)} 个"
+            self.log(summary)
+            if failed:
+                self.ui_channel.call(messagebox.showwarning, "完成", summary)
             else:
-                total_duration = min_duration  # 默认最小持续时间
-            
-            # 如果持续时间足够长，添加到结果中
-            if total_duration >= min_duration:
-                # 计算平均频率
-                avg_freq = np.mean(frequencies[i:j])
+                self.ui_channel.call(messagebox.showinfo, "成功", summary)
                 
-                # 根据频率决定使用beep还是sleep
-                if avg_freq >= low_freq_threshold:
-                    processed_freqs.append(avg_freq)
-                    processed_durations.append(total_duration)
-                    processed_types.append('beep')
-                else:
-                    processed_freqs.append(avg_freq)
-                    processed_durations.append(total_duration)
-                    processed_types.append('sleep')
-            
-            i = j if j > i + 1 else i + 1
-        
-        self.log(f"自动检测完成，生成{len(processed_freqs)}个音频段")
-        return processed_freqs, processed_durations, processed_types
+        except Exception as e:
+            self.log(f"批量转换过程中出错: {str(e)}")
+            self.ui_channel.call(messagebox.showerror, "错误", f"批量转换过程中出错: {str(e)}")
+        finally:
+            self.ui_channel.call(self.enable_buttons, True)
+            self.ui_channel.progress(100)
 
-    def mp3_to_winsound(self, mp3_file, output_file=None, function_name=None, fixed_duration=None, min_duration=0.1, freq_threshold=50.0, low_freq_threshold=100.0, use_dynamic=False, use_auto_detection=False):
-        """将MP3文件转换为使用winsound.beep播放的Python代码"""
-        # 如果未指定函数名，则使用main或main_xx格式
-        if function_name is None:
-            if self.function_counter == 0:
-                function_name = "main"
-            else:
-                function_name = f"main_{self.function_counter:02d}"
-            self.function_counter += 1
-        
-        # 如果未指定输出文件，则使用与输入文件相同的名称但扩展名为.py
-        if output_file is None:
-            output_file = os.path.splitext(mp3_file)[0] + "_winsound.py"
-        
+    def mp3_to_winsound(self, mp3_file, output_file=None, function_name=None, use_worker=False, **options):
+        """将MP3文件转换为使用winsound.beep播放的Python代码，界面在界面线程中更新
+
+        use_worker 为True时交给已预热的常驻分析进程处理，未运行时在本进程中转换。
+        """
         try:
-            self.log("开始加载音频文件...")
-            self.progress_var.set(10)
-            
-            # 加载音频文件
-            y, sr = librosa.load(mp3_file)
-            self.log(f"音频加载完成，采样率: {sr} Hz，时长: {len(y)/sr:.2f} 秒")
-            
-            self.progress_var.set(30)
-            
-            # 分析频率
-            frequencies, times = self.analyze_frequencies(y, sr)
-            
-            self.progress_var.set(50)
-            
-            # 根据模式处理音频段
-            if use_auto_detection:
-                processed_freqs, processed_durations, processed_types = self.process_auto_detection(
-                    frequencies, times, min_duration, freq_threshold, low_freq_threshold
-                )
-            elif use_dynamic:
-                processed_freqs, processed_durations = self.process_dynamic_segments(
-                    frequencies, times, min_duration, freq_threshold
-                )
-                processed_types = ['beep'] * len(processed_freqs)  # 动态模式全部使用beep
-            else:
-                # 固定模式
-                if fixed_duration:
-                    # 计算需要多少个固定时长的段
-                    total_duration = len(y) / sr
-                    num_segments = int(total_duration / fixed_duration)
-                    
-                    processed_freqs = []
-                    processed_durations = []
-                    
-                    for i in range(num_segments):
-                        start_idx = int(i * fixed_duration * sr)
-                        end_idx = int((i + 1) * fixed_duration * sr)
-                        if end_idx > len(y):
-                            end_idx = len(y)
-                        
-                        # 计算该段的主要频率
-                        segment = y[start_idx:end_idx]
-                        if len(segment) > 0:
-                            fft = np.fft.fft(segment)
-                            freqs = np.fft.fftfreq(len(segment), 1/sr)
-                            magnitude = np.abs(fft)
-                            
-                            # 只考虑正频率
-                            positive_freqs = freqs[:len(freqs)//2]
-                            positive_magnitude = magnitude[:len(magnitude)//2]
-                            
-                            # 找到幅度最大的频率
-                            if len(positive_magnitude) > 0:
-                                max_freq_idx = np.argmax(positive_magnitude)
-                                main_freq = positive_freqs[max_freq_idx]
-                                
-                                # 限制频率范围
-                                if 20 <= main_freq <= 20000:
-                                    processed_freqs.append(main_freq)
-                                else:
-                                    processed_freqs.append(440)  # 默认A4
-                            else:
-                                processed_freqs.append(440)
-                            
-                            processed_durations.append(fixed_duration)
-                
-                processed_types = ['beep'] * len(processed_freqs)  # 固定模式全部使用beep
-            
-            self.progress_var.set(70)
-            
-            # 生成可视化
-            if self.show_waveform_var.get() or self.show_spectrogram_var.get():
-                self.create_visualizations(y, sr, processed_freqs, processed_durations)
-            
-            self.progress_var.set(80)
-            
-            # 生成Python代码
-            self.log("正在生成Python代码...")
-            python_code = self.generate_python_code(processed_freqs, processed_durations, processed_types if use_auto_detection else None, function_name, mp3_file)
-            
-            # 显示生成的代码
-            self.code_text.delete(1.0, tk.END)
-            self.code_text.insert(1.0, python_code)
-            
-            # 保存到文件
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(python_code)
-            
-            self.log(f"Python代码已保存到: {output_file}")
-            self.progress_var.set(100)
-            
+            result = None
+            if use_worker:
+                try:
+                    result = submit(mp3_file, output_file, function_name, options,
+                                    on_log=self.log, on_progress=self.on_progress)
+                except WorkerUnavailable as e:
+                    self.log(f"{str(e)}，改为在本进程中转换")
+            if result is None:
+                result = self.converter.mp3_to_winsound(mp3_file, output_file, function_name, **options)
+            self.ui_channel.call(self.show_conversion_result, mp3_file, result, options)
             return True
             
         except Exception as e:
             self.log(f"转换过程中发生错误: {str(e)}")
             return False
 
-    def generate_python_code(self, frequencies, durations, types=None, function_name="main", original_file=""):
-        """生成Python播放代码"""
-        code_lines = []
-        code_lines.append("import winsound")
-        code_lines.append("import time")
-        code_lines.append("")
-        code_lines.append(f"# 从文件生成: {os.path.basename(original_file)}")
-        code_lines.append(f"# 音调数量: {len(frequencies)}")
-        code_lines.append(f"# 总时长: {sum(durations):.2f} 秒")
-        code_lines.append("")
-        code_lines.append(f"def {function_name}():")
-        code_lines.append("    \"\"\"播放转换后的音频\"\"\"")
-        
-        for i, (freq, duration) in enumerate(zip(frequencies, durations)):
-            # 确保频率在winsound.Beep的有效范围内
-            freq = max(37, min(32767, int(freq)))
-            duration_ms = max(1, int(duration * 1000))
-            
-            if types and types[i] == 'sleep':
-                code_lines.append(f"    time.sleep({duration:.3f})  # 低频段，使用静音")
-            else:
-                code_lines.append(f"    winsound.Beep({freq}, {duration_ms})")
-        
-        code_lines.append("")
-        code_lines.append("if __name__ == '__main__':")
-        code_lines.append(f"    {function_name}()")
+    def show_conversion_result(self, mp3_file, result, options=None):
+        """在界面线程中显示转换结果：分段数、可视化和生成的代码"""
+        # 流式固定模式既没有完整波形也没有逐帧分析结果，无法实时重新分段
+        if result['y'] is not None or len(result['analysis_frequencies']) > 0:
+            analyzed = len(result['analysis_frequencies']) > 0
+            self.last_analysis = {
+                'mp3_file': mp3_file,
+                'y': result['y'],
+                'sr': result['sr'],
+                # 固定模式不做逐帧分析，切换到动态或自动模式时才按下面的参数补做
+                'frequencies': result['analysis_frequencies'] if analyzed else None,
+                'times': result['analysis_times'] if analyzed else None,
+                'analysis_options': {key: (options or {}).get(key) for key in ('preset', 'engine', 'band')},
+                'function_name': result['function_name'],
+            }
+        else:
+            # 丢弃上一个文件的分析结果，之后修改参数时不再用它重新分段
+            self.last_analysis = None
+            if self.resegment_job is not None:
+                self.after_cancel(self.resegment_job)
+                self.resegment_job = None
+            # 正在进行的重新分段的结果也作废
+            self.resegment_generation += 1
+        self.segment_count_label.config(text=f"音频段: {len(result['frequencies'])}")
+        
+        # 生成可视化(流式模式下没有完整波形，跳过)
+        if result['y'] is not None and (self.show_waveform_var.get() or self.show_spectrogram_var.get()):
+            timer = result['timer']
+            with timer.span('visualization'):
+                self.create_visualizations(result['y'], result['sr'], result['frequencies'], result['durations'], result['spectrogram'])
+            # 可视化在转换结束后才进行，单独记录并更新JSON报告
+            self.log(f"可视化耗时: {timer.stages['visualization']:.3f} 秒")
+            try:
+                timer.write_json(report_path(result['output_file']))
+            except OSError as e:
+                self.log(f"耗时报告保存失败: {str(e)}")
+        
+        # 显示生成的代码
+        self.code_text.delete(1.0, tk.END)
+        self.code_text.insert(1.0, result['python_code'])
+
+    def schedule_resegment(self, *args):
+        """参数变化后延迟一段时间再重新分段，连续输入时只执行最后一次"""
+        if self.last_analysis is None:
+            return
+        if self.resegment_job is not None:
+            self.after_cancel(self.resegment_job)
+        self.resegment_job = self.after(300, self.start_resegment)
+
+    def start_resegment(self):
+        """在后台线程中用上次的分析结果重新分段"""
+        self.resegment_job = None
+        try:
+            options = self.get_conversion_options()
+        except (tk.TclError, ValueError):
+            # 输入框内容不是有效数字(例如正在输入中)
+            return
         
-        return "\n".join(code_lines)
+        analysis = self.last_analysis
+        options['use_streaming'] = analysis['y'] is None
+        # 分析预设、引擎和频带只影响解码和频谱分析，重新分段时沿用上次的分析结果
+        for key in ('preset', 'engine', 'band'):
+            del options[key]
+        # 输出格式和调用合并只影响代码生成
+        codegen_options = {key: options.pop(key) for key in ('output_format', 'coalesce')}
+        self.resegment_generation += 1
+        generation = self.resegment_generation
+        threading.Thread(target=self.resegment, args=(generation, analysis, options, codegen_options), daemon=True).start()
+
+    def resegment(self, generation, analysis, options, codegen_options):
+        """只运行分段和代码生成，不重新解码和分析(固定模式的结果第一次切换到动态或自动模式时补做分析)"""
+        try:
+            if analysis['frequencies'] is None and (options.get('use_dynamic') or options.get('use_auto_detection')):
+                analysis_options = {key: value for key, value in analysis['analysis_options'].items() if value is not None}
+                _, _, frequencies, times, _ = self.preview_converter.load_and_analyze(analysis['mp3_file'], **analysis_options)
+                analysis['frequencies'], analysis['times'] = frequencies, times
+            freqs, durations, types = self.preview_converter.process_segments(
+                analysis['frequencies'], analysis['times'], analysis['y'], analysis['sr'], analysis['mp3_file'], **options
+            )
+            python_code = self.preview_converter.generate_python_code(
+                freqs, durations, types if options.get('use_auto_detection') else None,
+                analysis['function_name'], analysis['mp3_file'], **codegen_options
+            )
+        except Exception as e:
+            self.log(f"重新分段时出错: {str(e)}")
+            return
+        self.ui_channel.call(self.show_resegment_result, generation, len(freqs), python_code)
+
+    def show_resegment_result(self, generation, segment_count, python_code):
+        """在主线程中更新分段数和代码预览，过期的结果直接丢弃"""
+        if generation != self.resegment_generation:
+            return
+        self.segment_count_label.config(text=f"音频段: {segment_count}")
+        self.code_text.delete(1.0, tk.END)
+        self.code_text.insert(1.0, python_code)
+
+    def create_visualizations(self, y, sr, frequencies, durations, spectrogram=None):
+        """创建音频可视化
 
-    def create_visualizations(self, y, sr, frequencies, durations):
-        """创建音频可视化"""
+        spectrogram 为分析阶段已缩小到显示分辨率的幅度谱，为None时(例如旧缓存)才重新计算。
+        """
         self.log("正在生成可视化图表...")
         
         # 清除之前的图表
@@ -553,18 +560,37 @@ class MP3ToWinsoundApp(tk.Tk):
         fig, axes = plt.subplots(2, 1, figsize=(12, 8))
         
         if self.show_waveform_var.get():
-            # 波形图
-            time_axis = np.linspace(0, len(y) / sr, len(y))
-            axes[0].plot(time_axis, y)
+            # 波形图：从包络金字塔中只取与屏幕像素数相当的点，缩放时按新范围重新取
+            if self.waveform_pyramid is None or self.waveform_pyramid.y is not y:
+                self.waveform_pyramid = WaveformPyramid(y, sr)
+            pyramid = self.waveform_pyramid
+            
+            wave_line, = axes[0].plot([], [], linewidth=0.5)
+            
+            def redraw_waveform(ax):
+                start_time, end_time = ax.get_xlim()
+                wave_line.set_data(*pyramid.line_data(start_time, end_time, ax.get_window_extent().width))
+            
+            axes[0].set_xlim(0, pyramid.duration)
+            axes[0].set_ylim(*pyramid.amplitude_range())
+            axes[0].callbacks.connect('xlim_changed', redraw_waveform)
+            redraw_waveform(axes[0])
             axes[0].set_title('音频波形')
             axes[0].set_xlabel('时间 (秒)')
             axes[0].set_ylabel('幅度')
             axes[0].grid(True)
         
         if self.show_spectrogram_var.get():
-            # 频谱图
-            D = librosa.amplitude_to_db(np.abs(librosa.stft(y)), ref=np.max)
-            img = librosa.display.specshow(D, y_axis='hz', x_axis='time', sr=sr, ax=axes[1])
+            # 频谱图：复用分析阶段的幅度谱，只对缩小后的矩阵转换分贝并绘制
+            if spectrogram is None:
+                magnitude = np.abs(librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH))
+                spectrogram = downsample_spectrogram(
+                    magnitude, librosa.fft_frequencies(sr=sr, n_fft=N_FFT),
+                    librosa.frames_to_time(np.arange(magnitude.shape[1]), sr=sr, hop_length=HOP_LENGTH)
+                )
+            D = librosa.amplitude_to_db(spectrogram['magnitude'], ref=np.max)
+            img = librosa.display.specshow(D, x_coords=spectrogram['times'], y_coords=spectrogram['freqs'],
+                                           y_axis='hz', x_axis='time', sr=sr, ax=axes[1])
             axes[1].set_title('频谱图')
             plt.colorbar(img, ax=axes[1], format='%+2.0f dB')
         
@@ -573,11 +599,22 @@ class MP3ToWinsoundApp(tk.Tk):
         # 将图表嵌入到tkinter中
         canvas = FigureCanvasTkAgg(fig, self.viz_frame)
         canvas.draw()
+        NavigationToolbar2Tk(canvas, self.viz_frame).update()
         canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
         
         self.log("可视化图表生成完成")
 
-    def play_mp3_with_threads(self, mp3_file):
-        """多线程版本的MP3转换"""
-        # 这里可以实现多线程版本，暂时使用单线程版本
-        return self.mp3_to_winsound(mp3_file)
\ No newline at end of file
+    def play_mp3_with_threads(self, mp3_files, options, workers=None):
+        """用进程池并行转换多个MP3文件，每完成一个文件就记录结果"""
+        finished = []
+        
+        def on_result(result):
+            finished.append(result)
+            if result['ok']:
+                self.log(f"[{len(finished)}/{len(mp3_files)}] 完成: {os.path.basename(result['mp3_file'])}，"
+                         f"{result['segments']}个音频段，耗时{result['elapsed']:.2f}秒")
+            else:
+                self.log(f"[{len(finished)}/{len(mp3_files)}] 失败: {os.path.basename(result['mp3_file'])}: {result['error']}")
+            self.ui_channel.progress(len(finished) / len(mp3_files) * 100, f"已完成 {len(finished)}/{len(mp3_files)} 个文件")
+        
+        return batch_convert(mp3_files, options, workers=workers, on_result=on_result, cache_dir=self.cache.cache_dir)
\ No newline at end of file
@@ -0,0 +1,125 @@
+from collections import namedtuple
+
+import librosa
+import numpy as np
+
+from analysis import dominant_frequencies, fixed_segment_frequencies
+from band import band_frequencies
+from presets import DEFAULT_BAND
+from converter import ANALYSIS_SR, HOP_LENGTH, N_FFT
+
+# v1.0/v2.0 使用的音符表：37-32767Hz 的十二平均律(取整数Hz)，C4到B5沿用最初的取值
+CLASSIC_NOTES = np.array([261, 277, 293, 311, 329, 349, 370, 392, 415, 440, 466, 493,
+                          523, 554, 587, 622, 659, 698, 740, 783, 831, 880, 932, 987])
+NOTE_TABLE = np.round(440 * 2.0 ** ((np.arange(12, 144) - 69) / 12)).astype(int)
+NOTE_TABLE[60 - 12:84 - 12] = CLASSIC_NOTES
+NOTE_TABLE = NOTE_TABLE[(NOTE_TABLE >= 37) & (NOTE_TABLE <= 32767)]
+
+# name: 注册名; description: 说明; sr: 分析采样率(None 表示使用原始采样率);
+# extract(y, sr) -> (频率数组, 持续时间数组)，即送入代码生成之前的音调序列
+PitchExtractor = namedtuple('PitchExtractor', ['name', 'description', 'sr', 'extract'])
+
+
+def nearest_notes(frequencies, table=NOTE_TABLE):
+    """把频率量化到表中最接近的音符，距离相同时取较低的音(与 min(..., key=abs差) 的结果相同)
+
+    main4.1 中所有音符量化都经过这里。main1.0.py 和 main2.0++.py 是单文件脚本，各自保留一份
+    quantize_to_notes，修改取舍规则时需要一起改。
+    """
+    frequencies = np.asarray(frequencies, dtype=np.float64)
+    upper = np.clip(np.searchsorted(table, frequencies), 1, len(table) - 1)
+    lower = upper - 1
+    use_upper = np.abs(table[upper] - frequencies) < np.abs(frequencies - table[lower])
+    return np.where(use_upper, upper, lower)
+
+
+def extract_piptrack_notes(y, sr, min_note_duration=0.05, magnitude_ratio=0.1):
+    """v1.0/v2.0：librosa.piptrack 取每帧最强的音高，量化到音符表，相同音符连成一段
+
+    幅度低于全局最大值 magnitude_ratio 倍的帧视为静音并结束当前音符；音高为0的帧保持当前状态；
+    短于 min_note_duration 的音符丢弃。
+    """
+    pitches, magnitudes = librosa.piptrack(y=y, sr=sr, n_fft=N_FFT, hop_length=HOP_LENGTH)
+    n_frames = pitches.shape[1]
+    if n_frames == 0:
+        return np.zeros(0), np.zeros(0)
+    times = librosa.frames_to_time(np.arange(n_frames), sr=sr, hop_length=HOP_LENGTH)
+
+    frame_idx = np.arange(n_frames)
+    peak = np.argmax(magnitudes, axis=0)
+    peak_magnitude = magnitudes[peak, frame_idx]
+    peak_pitch = pitches[peak, frame_idx]
+
+    # 每帧的状态：音符下标，-1 为静音
+    labels = nearest_notes(peak_pitch)
+    silent = peak_magnitude < np.max(magnitudes) * magnitude_ratio
+    labels[silent] = -1
+    # 音高为0的帧不改变状态：沿用之前最近一个有效帧的状态，开头的视为静音
+    unchanged = (peak_pitch == 0) & ~silent
+    source = np.where(unchanged, -1, frame_idx)
+    np.maximum.accumulate(source, out=source)
+    labels = np.where(source >= 0, labels[np.maximum(source, 0)], -1)
+
+    run_starts = np.concatenate(([0], np.flatnonzero(np.diff(labels) != 0) + 1))
+    run_labels = labels[run_starts]
+    end_times = np.append(times[run_starts[1:]], times[-1])
+    durations = end_times - times[run_starts]
+    keep = (run_labels >= 0) & (durations > min_note_duration)
+    return NOTE_TABLE[run_labels[keep]].astype(np.float64), durations[keep]
+
+
+def extract_stft_argmax_2048(y, sr, fmin=80, fmax=2000):
+    """v3.0/v4.0：n_fft=2048 的STFT逐帧取幅度最大的频点，只保留 fmin-fmax 内的帧(取整)"""
+    magnitude = np.abs(librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH))
+    freqs = librosa.fft_frequencies(sr=sr, n_fft=N_FFT)
+    peak_freqs = freqs[np.argmax(magnitude, axis=0)]
+    peak_freqs = peak_freqs[(peak_freqs >= fmin) & (peak_freqs <= fmax)].astype(int).astype(np.float64)
+    return peak_freqs, np.full(len(peak_freqs), HOP_LENGTH / sr)
+
+
+def extract_stft_argmax_default(y, sr):
+    """v4.1：22050Hz、librosa默认分辨率的STFT，每帧取可听范围(20-20000Hz)内幅度最大的频点"""
+    magnitude = np.abs(librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH))
+    freqs = librosa.fft_frequencies(sr=sr, n_fft=N_FFT)
+    peak_freqs = dominant_frequencies(magnitude, freqs)
+    return peak_freqs, np.full(len(peak_freqs), HOP_LENGTH / sr)
+
+
+def extract_band(y, sr, method, fmin=DEFAULT_BAND[0], fmax=DEFAULT_BAND[1]):
+    """频带引擎：只在 fmin-fmax 内计算频谱，每帧取幅度最大的频点"""
+    peak_freqs = band_frequencies(y, sr, N_FFT, HOP_LENGTH, fmin, fmax, method)
+    return peak_freqs, np.full(len(peak_freqs), HOP_LENGTH / sr)
+
+
+def extract_fixed_fft(y, sr, fixed_duration=0.1):
+    """固定模式：按固定时长切段，每段一次FFT取主要频率"""
+    return fixed_segment_frequencies(y, sr, fixed_duration)
+
+
+EXTRACTORS = {
+    extractor.name: extractor for extractor in (
+        PitchExtractor('piptrack', "librosa.piptrack + 音符表(v1.0/v2.0)", None, extract_piptrack_notes),
+        PitchExtractor('stft2048', "STFT argmax, n_fft=2048, 80-2000Hz(v3.0/v4.0)", None, extract_stft_argmax_2048),
+        PitchExtractor('stft', "STFT argmax, 22050Hz默认分辨率(v4.1)", ANALYSIS_SR, extract_stft_argmax_default),
+        PitchExtractor('zoom', "频带Zoom FFT, 37-5000Hz 512点", ANALYSIS_SR,
+                       lambda y, sr: extract_band(y, sr, 'zoom')),
+        PitchExtractor('goertzel', "频带音符Goertzel滤波器组, 37-5000Hz", ANALYSIS_SR,
+                       lambda y, sr: extract_band(y, sr, 'goertzel')),
+        PitchExtractor('fixed', "逐段FFT(固定模式, 每段0.1秒)", ANALYSIS_SR, extract_fixed_fft),
+    )
+}
+
+
+def get_extractor(name):
+    """按名称取得音高提取器，名称不存在时抛出 ValueError"""
+    try:
+        return EXTRACTORS[name]
+    except KeyError:
+        raise ValueError(f"未知的音高提取器: {name}，可选: {', '.join(EXTRACTORS)}") from None
+
+
+def prepare_input(extractor, y, sr):
+    """把输入重采样到提取器使用的采样率，返回 (y, sr)"""
+    if extractor.sr is None or extractor.sr == sr:
+        return y, sr
+    return librosa.resample(y, orig_sr=sr, target_sr=extractor.sr), extractor.sr
@@ -0,0 +1,58 @@
+import math
+from collections import namedtuple
+
+# 分析预设：采样率、STFT帧长和帧移一起选择，三者共同决定频率分辨率(sr / n_fft)、
+# 时间分辨率(hop_length / sr)和计算量。不依赖 librosa，图形界面启动时即可使用。
+AnalysisPreset = namedtuple('AnalysisPreset', ['name', 'label', 'sr', 'n_fft', 'hop_length', 'description'])
+# frames: 预计帧数; fft_work: 预计FFT计算量(帧数 × n_fft·log2(n_fft)); relative_cost: 相对 standard 的计算量
+PresetEstimate = namedtuple('PresetEstimate', ['frames', 'fft_work', 'relative_cost'])
+
+PRESETS = {
+    preset.name: preset for preset in (
+        AnalysisPreset('draft', "草稿", 11025, 1024, 512,
+                       "11025Hz，只分析5.5kHz以下；频率分辨率10.8Hz，帧移46ms，计算量约为标准的1/4"),
+        AnalysisPreset('standard', "标准", 22050, 2048, 512,
+                       "22050Hz(librosa默认值)；频率分辨率10.8Hz，帧移23ms"),
+        AnalysisPreset('precise', "精确", 22050, 4096, 256,
+                       "22050Hz；频率分辨率5.4Hz，帧移12ms，计算量约为标准的4.4倍"),
+    )
+}
+DEFAULT_PRESET = 'standard'
+
+# 分析引擎(见 band.py): stft=完整STFT; goertzel=频带内十二平均律音符的 Goertzel 滤波器组。
+# band.py 的 Zoom FFT 比完整STFT更慢，不作为引擎提供，只在 benchmark.py --extractors 中对比
+ENGINES = ('stft', 'goertzel')
+DEFAULT_ENGINE = 'stft'
+# 频带引擎的默认频带：winsound.Beep 的下限37Hz到5kHz(实际旋律基本都在5kHz以下)
+DEFAULT_BAND = (37.0, 5000.0)
+
+# 生成代码的格式(见 converter.generate_python_code): statements=每段一行 Beep/sleep 语句;
+# table=base64 打包的 (频率, 毫秒) 常量表加一个短播放循环，长音频的文件小一个数量级
+OUTPUT_FORMATS = ('statements', 'table')
+DEFAULT_OUTPUT_FORMAT = 'statements'
+
+
+def get_preset(name):
+    """按名称取得分析预设，名称不存在时抛出 ValueError"""
+    try:
+        return PRESETS[name]
+    except KeyError:
+        raise ValueError(f"未知的分析预设: {name}，可选: {', '.join(PRESETS)}") from None
+
+
+def estimate(preset, duration):
+    """预测 duration 秒的输入在该预设下的帧数和计算量(与 librosa.stft(center=True) 的帧数相同)"""
+    def work(p):
+        frames = 1 + int(duration * p.sr) // p.hop_length
+        return frames, frames * p.n_fft * math.log2(p.n_fft)
+
+    frames, fft_work = work(preset)
+    _, standard_work = work(PRESETS[DEFAULT_PRESET])
+    return PresetEstimate(frames, fft_work, fft_work / standard_work if standard_work else 1.0)
+
+
+def format_estimate(preset, duration):
+    """运行前显示的一行预测信息"""
+    result = estimate(preset, duration)
+    return (f"分析预设 {preset.name}({preset.label}): {preset.sr}Hz, n_fft={preset.n_fft}, hop={preset.hop_length}，"
+            f"{duration:.1f} 秒输入预计 {result.frames} 帧，计算量约为标准的 {result.relative_cost:.2f} 倍")
@@ -0,0 +1,88 @@
+import time
+from collections import namedtuple
+
+# 两次进度回调之间的最短间隔(秒)，进度汇报只占运行时间很小的一部分
+MIN_REPORT_INTERVAL = 0.1
+
+# 各阶段在总进度条中所占的区间(百分比)
+STAGE_SPANS = {
+    'decode': (0, 30),
+    'analysis': (30, 50),
+    'segmentation': (50, 80),
+    'codegen': (80, 100),
+}
+
+STAGE_NAMES = {
+    'decode': "解码",
+    'analysis': "频率分析",
+    'segmentation': "分段",
+    'codegen': "生成代码",
+}
+
+# stage: 阶段名; done/total: 已完成/总工作量; unit: 工作量单位;
+# percent: 总进度(0-100); rate: 本阶段每秒完成的工作量; eta: 本阶段预计剩余秒数(未知时为None)
+ProgressEvent = namedtuple('ProgressEvent', ['stage', 'done', 'total', 'unit', 'percent', 'rate', 'eta'])
+
+
+def format_progress(event):
+    """把进度事件格式化为一行文字，例如 "频率分析 1200/5000 帧, 3500 帧/秒, 剩余 1.1 秒" """
+    text = f"{STAGE_NAMES.get(event.stage, event.stage)} {event.done}/{event.total} {event.unit}"
+    if event.rate > 0:
+        text += f", {event.rate:.0f} {event.unit}/秒"
+    if event.eta is not None:
+        text += f", 剩余 {event.eta:.1f} 秒"
+    return text
+
+
+class ProgressTracker:
+    """按阶段统计 已完成/总工作量，计算吞吐量和剩余时间，并限制回调频率
+
+    callback(event) 收到 ProgressEvent；callback 为 None 时所有方法都直接返回。
+    阶段开始和结束时总会回调，中间的 update() 至少间隔 min_interval 秒才回调一次。
+    """
+
+    def __init__(self, callback=None, min_interval=MIN_REPORT_INTERVAL):
+        self.callback = callback
+        self.min_interval = min_interval
+        self.stage = None
+        self.total = 0
+        self.unit = ""
+        self.span = (0, 100)
+        self._stage_start = 0.0
+        self._last_report = 0.0
+
+    def start_stage(self, stage, total, unit, span=None):
+        """开始一个新阶段，span 默认取 STAGE_SPANS 中该阶段的区间"""
+        if self.callback is None:
+            return
+        self.stage = stage
+        self.total = max(0, int(total))
+        self.unit = unit
+        self.span = span or STAGE_SPANS.get(stage, (0, 100))
+        self._stage_start = time.perf_counter()
+        self._report(0, self._stage_start)
+
+    def update(self, done):
+        """报告本阶段已完成的工作量，距上次回调不足 min_interval 秒时忽略"""
+        if self.callback is None:
+            return
+        now = time.perf_counter()
+        if now - self._last_report >= self.min_interval:
+            self._report(done, now)
+
+    def finish_stage(self):
+        """本阶段完成"""
+        if self.callback is None or self.stage is None:
+            return
+        self._report(self.total, time.perf_counter())
+
+    def _report(self, done, now):
+        done = min(int(done), self.total)
+        elapsed = now - self._stage_start
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - done) / rate if rate > 0 else None
+        fraction = done / self.total if self.total else 1.0
+        start, end = self.span
+        self._last_report = now
+        self.callback(ProgressEvent(self.stage, done, self.total, self.unit,
+                                    start + (end - start) * fraction, rate, eta))
@@ -0,0 +1,208 @@
+import numpy as np
+
+# 向后查找频率差异超过阈值的位置时，一次向量化比较的块数
+SCAN_WINDOW = 32
+
+
+def similar_runs(frequencies, freq_threshold, window=SCAN_WINDOW):
+    """找出与段首频率差异不超过阈值的连续段，返回每段起始帧的下标数组
+
+    与旧实现的规则完全相同：每段以首帧为基准，向后延伸到第一个 |f - 首帧| > 阈值 的帧为止。
+    先用 np.diff 把相邻相等的帧压缩成块(相等的帧与基准的差相同，必然同进同出)，
+    再对每个块向后 window 个块做一次向量化比较求出"下一段起点"，只有超出窗口的长段才单独查找
+    (见 next_differing，查找耗时与段长成正比，总耗时仍是线性的)。
+    """
+    f = np.asarray(frequencies, dtype=np.float64)
+    n = len(f)
+    if n == 0:
+        return np.zeros(0, dtype=np.intp)
+
+    if freq_threshold >= 0:
+        block_starts = np.concatenate(([0], np.flatnonzero(np.diff(f) != 0) + 1))
+    else:
+        # 阈值为负时任何两帧都不相似，每帧单独成段
+        block_starts = np.arange(n)
+    values = f[block_starts]
+    n_blocks = len(block_starts)
+
+    # next_block[b]: 以块b为段首时，下一段的起始块；-1 表示窗口内没有找到
+    next_block = np.full(n_blocks, -1, dtype=np.intp)
+    pending = np.arange(n_blocks)
+    for k in range(1, window + 1):
+        if len(pending) == 0:
+            break
+        reaches_end = pending + k >= n_blocks
+        next_block[pending[reaches_end]] = n_blocks
+        pending = pending[~reaches_end]
+        differs = ~(np.abs(values[pending + k] - values[pending]) <= freq_threshold)
+        next_block[pending[differs]] = pending[differs] + k
+        pending = pending[~differs]
+
+    if len(pending) == 0:
+        run_blocks = follow_chain(next_block, n_blocks)
+    else:
+        # 有超出窗口的长段：沿着段首链逐段向后走，只为真正用到的段首单独查找
+        run_blocks = []
+        b = 0
+        while b < n_blocks:
+            run_blocks.append(b)
+            nb = next_block[b]
+            if nb < 0:
+                nb = next_differing(values, b, b + window + 1, freq_threshold, window)
+            b = nb
+
+    return block_starts[np.asarray(run_blocks, dtype=np.intp)]
+
+
+def next_differing(values, b, start, freq_threshold, chunk):
+    """从 start 开始向后查找第一个与 values[b] 差异超过阈值的块，找不到时返回 len(values)
+
+    每次比较 chunk 个块，没有找到时块长加倍，比较的总块数不超过段长的约4倍，与剩余长度无关。
+    """
+    n = len(values)
+    while start < n:
+        stop = min(n, start + chunk)
+        far = np.flatnonzero(~(np.abs(values[start:stop] - values[b]) <= freq_threshold))
+        if len(far):
+            return start + far[0]
+        start = stop
+        chunk *= 2
+    return n
+
+
+def run_means(frequencies, run_starts):
+    """求每段的平均频率，结果与逐段调用 np.mean 完全相同
+
+    长度相同的段取成一个 (段数, 长度) 的二维数组按行求平均，每行的累加顺序与一维 np.mean 一致
+    (np.add.reduceat 的累加顺序不同，最后几位会有出入)。不同的长度最多约 sqrt(2n) 种。
+    """
+    f = np.asarray(frequencies, dtype=np.float64)
+    run_starts = np.asarray(run_starts)
+    lengths = np.diff(np.append(run_starts, len(f)))
+    means = np.empty(len(run_starts), dtype=np.float64)
+    for length in np.unique(lengths):
+        runs = np.flatnonzero(lengths == length)
+        means[runs] = f[run_starts[runs, None] + np.arange(length)].mean(axis=1)
+    return means
+
+
+def follow_chain(next_index, n):
+    """从下标0出发沿 next_index 跳转，返回经过的所有下标(升序)
+
+    next_index[i] > i，值为 n 表示结束。用倍增法：每轮把已知路径整体向后跳 2^k 步，
+    同时把跳转表自身复合一次，只需 log(段数) 轮向量化操作。
+    """
+    jump = np.append(next_index, n)
+    path = np.zeros(1, dtype=np.intp)
+    while True:
+        reached = jump[path]
+        reached = reached[reached < n]
+        if len(reached) == 0:
+            break
+        path = np.concatenate((path, reached))
+        jump = jump[jump]
+    return np.sort(path)
+
+
+def run_bounds(run_starts, n_frames, times):
+    """计算每段的起止时间，返回 (起始时间, 结束时间, 结束下标是否在 times 范围内)"""
+    times = np.asarray(times, dtype=np.float64)
+    last = np.append(run_starts[1:], n_frames) - 1
+    start_times = np.where(run_starts < len(times), times[np.minimum(run_starts, len(times) - 1)], 0.0)
+    end_valid = last < len(times)
+    end_times = times[np.minimum(last, len(times) - 1)]
+    return start_times, end_times, end_valid
+
+
+def process_dynamic_segments(frequencies, times, min_duration, freq_threshold):
+    """动态持续时间：返回 (平均频率数组, 持续时间数组)"""
+    n = len(frequencies)
+    if n == 0:
+        return np.zeros(0), np.zeros(0)
+
+    run_starts = similar_runs(frequencies, freq_threshold)
+    start_times, end_times, end_valid = run_bounds(run_starts, n, times)
+    end_times = np.where(end_valid, end_times, np.asarray(times, dtype=np.float64)[-1])
+    durations = end_times - start_times
+
+    keep = durations >= min_duration
+    return run_means(frequencies, run_starts)[keep], durations[keep]
+
+
+def process_auto_detection(frequencies, times, min_duration, freq_threshold, low_freq_threshold):
+    """自动检测：返回 (平均频率数组, 持续时间数组, 类型列表)，低于低频阈值的段为 'sleep'"""
+    n = len(frequencies)
+    if n == 0:
+        return np.zeros(0), np.zeros(0), []
+
+    run_starts = similar_runs(frequencies, freq_threshold)
+    start_times, end_times, end_valid = run_bounds(run_starts, n, times)
+    durations = np.where(end_valid, end_times - start_times, min_duration)
+
+    keep = durations >= min_duration
+    means = run_means(frequencies, run_starts)[keep]
+    types = np.where(means >= low_freq_threshold, 'beep', 'sleep').tolist()
+    return means, durations[keep], types
+
+
+def merge_short_segments(frequencies, times, min_duration):
+    """按最短持续时间切分：返回 (段首频率数组, 持续时间数组)
+
+    每段从切点开始累积，直到时长不小于 min_duration 时在下一帧切开，与旧实现逐帧累积的结果相同。
+    """
+    n = len(frequencies)
+    times = np.asarray(times, dtype=np.float64)
+    if n == 0 or len(times) == 0:
+        return np.zeros(0), np.zeros(0)
+
+    f = np.asarray(frequencies, dtype=np.float64)
+    step = times[-1] - times[-2] if len(times) > 1 else 0.1
+    # 帧数多于时间点时，多出的帧按旧实现使用最后时间点加一帧间隔
+    padded = np.concatenate((times[:n], np.full(max(0, n - len(times)), times[-1] + step)))
+
+    # cut[i]: 以帧i为段首时下一个切点，即第一个满足 padded[c] - padded[i] >= min_duration 的 c > i
+    cut = np.searchsorted(padded, padded + min_duration, side='left')
+    cut = np.clip(cut, np.arange(1, n + 1), n)
+    # searchsorted 比较的是 padded[c] >= padded[i] + min_duration，浮点舍入可能与减法判断相差一帧，逐帧修正
+    while True:
+        too_late = (cut - 1 > np.arange(n)) & (padded[np.maximum(cut - 1, 0)] - padded >= min_duration)
+        too_early = (cut < n) & ~(padded[np.minimum(cut, n - 1)] - padded >= min_duration)
+        if not too_late.any() and not too_early.any():
+            break
+        cut = cut - too_late + too_early
+
+    starts = follow_chain(cut, n)
+
+    merged_freqs = f[starts[:-1]]
+    merged_durations = padded[starts[1:]] - padded[starts[:-1]]
+
+    final_duration = times[-1] - padded[starts[-1]] + step
+    if final_duration >= min_duration:
+        merged_freqs = np.append(merged_freqs, f[starts[-1]])
+        merged_durations = np.append(merged_durations, final_duration)
+    return merged_freqs, merged_durations
+
+
+def playback_calls(frequencies, durations, types=None):
+    """把分段结果转换为实际的播放调用，返回 (频率数组, 毫秒数组)，频率为0表示 time.sleep
+
+    频率限制在winsound.Beep的有效范围 37-32767Hz 内并截断取整，Beep 的毫秒数截断取整且至少为1；
+    静音段的毫秒数四舍五入(与 time.sleep({duration:.3f}) 的精度相同)。
+    """
+    freqs = np.clip(np.asarray(frequencies, dtype=np.float64).astype(np.int64), 37, 32767)
+    if types:
+        freqs[np.asarray(types) == 'sleep'] = 0
+    ms = np.asarray(durations, dtype=np.float64) * 1000
+    ms = np.where(freqs == 0, np.rint(ms), np.maximum(1, ms)).astype(np.int64)
+    return freqs, ms
+
+
+def coalesce_calls(freqs, ms):
+    """合并相邻的相同调用：频率相同的相邻 Beep 合并为一次，相邻的 sleep 合并为一次，毫秒数相加
+
+    在取整之后合并，因此每段的毫秒数与不合并时完全相同，总时长不变。
+    """
+    if len(freqs) == 0:
+        return freqs, ms
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(freqs) != 0) + 1))
+    return freqs[starts], np.add.reduceat(ms, starts)
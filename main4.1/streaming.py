@@ -0,0 +1,70 @@
+import librosa
+import numpy as np
+
+from analysis import MAX_AUDIBLE_FREQ, MIN_AUDIBLE_FREQ, dominant_frequencies, fixed_segment_frequencies
+from decoder import audio_info, iter_mono_blocks
+
+# 每个数据块包含的STFT帧数，块越大吞吐越高，内存占用也越高
+DEFAULT_BLOCK_FRAMES = 1024
+
+
+def stream_frequencies(audio_file, n_fft=2048, hop_length=512, block_frames=DEFAULT_BLOCK_FRAMES,
+                       band=(MIN_AUDIBLE_FREQ, MAX_AUDIBLE_FREQ)):
+    """分块解码音频并逐块输出每帧在 band=(fmin, fmax) 内的主要频率
+
+    使用原始采样率分块读取，相邻块之间保留 n_fft - hop_length 个采样的重叠，
+    因此每块的帧与整体计算STFT(center=False)时完全对齐。不足 n_fft 个采样的块(文件太短或末尾的余量)
+    不包含完整的帧，直接跳过，输出的帧数与整体计算时相同。
+    每处理完一个块就产出 (frequencies, times)，峰值内存只与 block_frames 有关，与音频长度无关。
+    """
+    sr = audio_info(audio_file).samplerate
+    freqs = librosa.fft_frequencies(sr=sr, n_fft=n_fft)
+
+    frame_offset = 0
+    # 传入已打开的文件对象，文件名可以包含任意 Unicode 字符
+    with open(audio_file, 'rb') as raw:
+        blocks = librosa.stream(raw, block_length=block_frames, frame_length=n_fft,
+                                hop_length=hop_length, mono=True)
+        for block in blocks:
+            if len(block) < n_fft:
+                continue
+            magnitude = np.abs(librosa.stft(block, n_fft=n_fft, hop_length=hop_length, center=False))
+            block_freqs = dominant_frequencies(magnitude, freqs, *band)
+            times = librosa.frames_to_time(np.arange(frame_offset, frame_offset + len(block_freqs)),
+                                           sr=sr, hop_length=hop_length)
+            frame_offset += len(block_freqs)
+            yield block_freqs, times
+
+
+def stream_fixed_segments(audio_file, fixed_duration, block_segments=256):
+    """按固定时长分块读取音频，逐块批量求每段主要频率，不把整个文件读入内存
+
+    每次读取 block_segments 段，产出 (频率数组, 持续时间数组)。fixed_duration 不足一个采样时抛出 ValueError。
+    """
+    sr = audio_info(audio_file).samplerate
+    segment_length = int(round(fixed_duration * sr))
+    if segment_length <= 0:
+        raise ValueError(f"固定持续时间 {fixed_duration} 秒太短，至少为 {1 / sr:.6f} 秒")
+
+    for block, _ in iter_mono_blocks(audio_file, segment_length * block_segments):
+        yield fixed_segment_frequencies(block, sr, fixed_duration, chunk_segments=block_segments)
+
+
+def analyze_stream(audio_file, n_fft=2048, hop_length=512, block_frames=DEFAULT_BLOCK_FRAMES, on_block=None,
+                   band=(MIN_AUDIBLE_FREQ, MAX_AUDIBLE_FREQ)):
+    """消费 stream_frequencies 的输出，拼接成完整的频率和时间数组
+
+    on_block(frequencies, times) 在每块处理完后被调用，可用于实时显示进度。
+    每帧只保留一个频率值，即使是一小时的音频也只占用几MB。
+    """
+    all_freqs = []
+    all_times = []
+    for block_freqs, times in stream_frequencies(audio_file, n_fft, hop_length, block_frames, band):
+        all_freqs.append(block_freqs)
+        all_times.append(times)
+        if on_block is not None:
+            on_block(block_freqs, times)
+
+    if not all_freqs:
+        return np.zeros(0), np.zeros(0)
+    return np.concatenate(all_freqs), np.concatenate(all_times)
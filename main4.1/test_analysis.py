@@ -0,0 +1,21 @@
+import numpy as np
+
+from analysis import DEFAULT_FREQ, fixed_segment_frequencies
+
+
+def test_one_sample_segments_use_default_frequency():
+    sr = 22050
+    y = np.random.default_rng(0).standard_normal(100)
+    freqs, durations = fixed_segment_frequencies(y, sr, 1 / sr)
+    assert len(freqs) == len(durations) == 100
+    assert np.all(freqs == DEFAULT_FREQ)
+    assert np.allclose(durations, 1 / sr)
+
+
+def test_one_sample_tail_is_dropped():
+    # 采样率低时1个采样也超过1毫秒，只能靠采样数把它排除
+    sr = 100
+    y = np.random.default_rng(0).standard_normal(7)
+    freqs, durations = fixed_segment_frequencies(y, sr, 3 / sr)
+    assert len(freqs) == len(durations) == 2
+    assert np.allclose(durations, 3 / sr)
@@ -0,0 +1,77 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+
+STAGE_NAMES = {
+    'decode': "解码",
+    'resample': "重采样",
+    'stft': "STFT",
+    'band_analysis': "频带分析",
+    'peak_picking': "峰值提取",
+    'spectrogram': "频谱缩小",
+    'streaming_analysis': "流式分析",
+    'segmentation': "分段",
+    'codegen': "生成代码",
+    'write': "写入文件",
+    'visualization': "可视化",
+}
+
+
+class StageTimer:
+    """用 perf_counter 记录每个阶段的耗时，同一阶段多次计时(如分块STFT)时累加
+
+    info 中保存输入时长、帧数、段数等与耗时一起输出的信息。
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.info = {}
+
+    @contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[stage] = self.stages.get(stage, 0.0) + time.perf_counter() - start
+
+    @property
+    def total(self):
+        return sum(self.stages.values())
+
+    def report(self):
+        """返回可直接序列化为JSON的字典"""
+        return {
+            'info': self.info,
+            'stages': {stage: round(seconds, 6) for stage, seconds in self.stages.items()},
+            'total_seconds': round(self.total, 6),
+        }
+
+    def summary_lines(self):
+        """每个阶段一行的耗时摘要，附带占比和输入信息"""
+        total = self.total
+        lines = [f"耗时统计(共 {total:.3f} 秒):"]
+        for stage, seconds in self.stages.items():
+            share = seconds / total * 100 if total > 0 else 0.0
+            lines.append(f"  {STAGE_NAMES.get(stage, stage)}: {seconds:.3f} 秒 ({share:.1f}%)")
+        info = self.info
+        if 'input_duration' in info:
+            line = f"  输入时长 {info['input_duration']:.2f} 秒"
+            if info.get('frames'):
+                line += f"，{info['frames']} 帧"
+            if 'segments' in info:
+                line += f"，{info['segments']} 个音频段"
+            if total > 0:
+                line += f"，{info['input_duration'] / total:.1f}x 实时"
+            lines.append(line)
+        return lines
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+
+
+def report_path(output_file):
+    """耗时报告与生成的 _winsound.py 放在一起，例如 song_winsound.py -> song_winsound_timing.json"""
+    return os.path.splitext(output_file)[0] + "_timing.json"
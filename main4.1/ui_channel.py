@@ -0,0 +1,49 @@
+import datetime
+import queue
+
+# 界面线程每秒处理消息的次数
+DEFAULT_FPS = 30
+# 每帧最多处理的消息数，避免大量日志一次性涌入时界面卡顿
+MAX_ITEMS_PER_FRAME = 2000
+
+
+class UIChannel:
+    """工作线程到Tk界面线程的消息通道
+
+    工作线程只往队列里放消息，不会阻塞，也不接触任何Tk控件；
+    界面线程用 after() 按固定帧率调用 drain()，一次取出一批：日志合并为一次插入，进度只保留最新值。
+    """
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+
+    def log(self, message):
+        """记录一条日志，时间戳取消息产生时的时间"""
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+        self._queue.put(('log', f"[{timestamp}] {message}\n"))
+
+    def progress(self, value, detail=None):
+        """更新进度(0-100)，detail 为显示在进度条下方的说明文字(吞吐量、剩余时间等)"""
+        self._queue.put(('progress', (value, detail)))
+
+    def call(self, func, *args):
+        """在界面线程中调用 func(*args)，用于更新控件、弹出对话框等"""
+        self._queue.put(('call', (func, args)))
+
+    def drain(self, max_items=MAX_ITEMS_PER_FRAME):
+        """取出队列中已有的消息，返回 (日志文本, 最新的 (进度, 说明) 或None, [(func, args), ...])"""
+        lines = []
+        progress = None
+        calls = []
+        for _ in range(max_items):
+            try:
+                kind, payload = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'log':
+                lines.append(payload)
+            elif kind == 'progress':
+                progress = payload
+            else:
+                calls.append(payload)
+        return ''.join(lines), progress, calls
@@ -0,0 +1,82 @@
+import numpy as np
+
+# 最细一层每块包含的采样数，以及相邻两层之间的倍数
+BASE_BLOCK = 32
+LEVEL_FACTOR = 4
+
+
+class WaveformPyramid:
+    """波形的最小/最大值包络金字塔
+
+    每个文件只计算一次，之后任意缩放范围都只需要从合适的层取出与屏幕像素数相当的点，
+    绘图点数与音频长度无关。
+    """
+
+    def __init__(self, y, sr, base_block=BASE_BLOCK, factor=LEVEL_FACTOR):
+        self.y = y
+        self.sr = sr
+        # 每层为 (块大小, 最小值数组, 最大值数组)
+        self.levels = []
+
+        block = base_block
+        n_blocks = len(y) // block
+        mins = y[:n_blocks * block].reshape(n_blocks, block).min(axis=1)
+        maxs = y[:n_blocks * block].reshape(n_blocks, block).max(axis=1)
+        while n_blocks >= 1:
+            self.levels.append((block, mins, maxs))
+            n_blocks = len(mins) // factor
+            mins = mins[:n_blocks * factor].reshape(n_blocks, factor).min(axis=1)
+            maxs = maxs[:n_blocks * factor].reshape(n_blocks, factor).max(axis=1)
+            block *= factor
+
+    @property
+    def duration(self):
+        return len(self.y) / self.sr
+
+    def amplitude_range(self):
+        """整段音频的 (最小值, 最大值)"""
+        if not self.levels:
+            return float(np.min(self.y, initial=0)), float(np.max(self.y, initial=0))
+        _, mins, maxs = self.levels[-1]
+        tail = self.y[len(mins) * self.levels[-1][0]:]
+        return float(min(mins.min(), np.min(tail, initial=0))), float(max(maxs.max(), np.max(tail, initial=0)))
+
+    def envelope(self, start_time, end_time, n_pixels):
+        """返回 [start_time, end_time] 内约 n_pixels 个点的 (时间, 最小值, 最大值)
+
+        每像素不足2个采样时直接返回原始采样(最小值与最大值相同)。
+        """
+        n_pixels = max(1, int(n_pixels))
+        start = max(0, int(start_time * self.sr))
+        end = min(len(self.y), int(np.ceil(end_time * self.sr)))
+        if end <= start:
+            empty = np.zeros(0)
+            return empty, empty, empty
+
+        samples_per_pixel = (end - start) / n_pixels
+        if samples_per_pixel < 2:
+            raw = self.y[start:end]
+            return np.arange(start, end) / self.sr, raw, raw
+
+        # 选择块大小不超过每像素采样数的最粗一层；比最细一层还细时直接用原始采样(范围很小，现算即可)
+        block, mins, maxs = 1, self.y, self.y
+        for candidate in self.levels:
+            if candidate[0] <= samples_per_pixel:
+                block, mins, maxs = candidate
+
+        i0 = start // block
+        i1 = min(len(mins), -(-end // block))
+        # 这一层的块数仍可能多于像素数，再合并成约 n_pixels 组
+        group = max(1, (i1 - i0) // n_pixels)
+        offsets = np.arange(i0, i1, group)
+        env_min = np.minimum.reduceat(mins, offsets)
+        env_max = np.maximum.reduceat(maxs, offsets)
+        # reduceat 的最后一组会一直延伸到数组末尾，这里截断到当前范围
+        env_min[-1] = mins[offsets[-1]:i1].min()
+        env_max[-1] = maxs[offsets[-1]:i1].max()
+        return (offsets + group / 2) * block / self.sr, env_min, env_max
+
+    def line_data(self, start_time, end_time, n_pixels):
+        """把包络转换成一条折线：每个像素位置上下各一点，绘制出来即为填充的波形轮廓"""
+        times, env_min, env_max = self.envelope(start_time, end_time, n_pixels)
+        return np.repeat(times, 2), np.column_stack((env_min, env_max)).ravel()
@@ -0,0 +1,234 @@
+import argparse
+import json
+import os
+import secrets
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+# 常驻分析进程的连接信息(地址和随机密钥)，与分析缓存放在同一目录，只有当前用户可读
+DEFAULT_INFO_FILE = os.path.join(os.path.expanduser("~"), ".cache", "mp3-2-winsound", "worker.json")
+DEFAULT_HOST = "127.0.0.1"
+# 端口为0时由系统分配空闲端口，客户端从信息文件中读取实际地址
+DEFAULT_PORT = 0
+# 连接常驻进程的超时时间(秒)，超时视为未运行
+PING_TIMEOUT = 2.0
+# 转换结果中只在本进程有用的大数组(完整PCM、频谱和逐帧分析结果)，不发回客户端
+LOCAL_ONLY_RESULTS = {'y': None, 'spectrogram': None, 'analysis_frequencies': [], 'analysis_times': []}
+
+
+class WorkerUnavailable(Exception):
+    """常驻分析进程未运行或无法连接"""
+
+
+def warm_up():
+    """预热：触发 librosa.stft、piptrack 和重采样器的延迟导入与初始化，返回用时(秒)"""
+    start = time.perf_counter()
+    import librosa
+    import numpy as np
+
+    y = np.random.default_rng(0).standard_normal(22050).astype(np.float32)
+    librosa.stft(y)
+    librosa.piptrack(y=y, sr=22050)
+    librosa.resample(y, orig_sr=44100, target_sr=22050)
+    return time.perf_counter() - start
+
+
+def write_info_file(path, address, authkey):
+    """写入连接信息，文件权限为仅当前用户可读写"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump({'host': address[0], 'port': address[1], 'authkey': authkey.hex(), 'pid': os.getpid()}, f)
+
+
+def read_info_file(path):
+    """读取连接信息，返回 (地址, 密钥)，文件不存在或损坏时抛出 WorkerUnavailable"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            info = json.load(f)
+        return (info['host'], info['port']), bytes.fromhex(info['authkey'])
+    except (OSError, ValueError, KeyError) as e:
+        raise WorkerUnavailable("常驻分析进程未运行") from e
+
+
+def handle_job(conn, converter_factory, message):
+    """执行一个转换任务，日志和进度随时发回客户端，最后发送结果或错误"""
+    _, mp3_file, output_file, function_name, options = message
+    converter = converter_factory(
+        log_callback=lambda text: conn.send(('log', text)),
+        progress_callback=lambda event: conn.send(('progress', event)),
+    )
+    try:
+        result = converter.mp3_to_winsound(mp3_file, output_file, function_name, **options)
+    except Exception as e:
+        conn.send(('error', str(e) or type(e).__name__))
+        return
+    conn.send(('result', {**result, **LOCAL_ONLY_RESULTS}))
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, info_file=DEFAULT_INFO_FILE, log=print):
+    """运行常驻分析进程：预热后在本机端口上接受转换任务，直到收到 shutdown
+
+    转换任务在后台线程中依次执行(同一时间只运行一个)，执行期间仍能立即响应 ping。
+
+    消息格式:
+        ('ping',) -> ('pong', 进程号)
+        ('convert', 文件, 输出文件, 函数名, 参数字典) -> 若干 ('log', 文本) / ('progress', ProgressEvent)，
+            最后 ('result', 结果字典) 或 ('error', 错误信息)
+        ('shutdown',) -> ('bye',)
+    所有任务共用一个分析缓存，同一文件再次转换时跳过解码和STFT。
+    """
+    from cache import AnalysisCache
+    from converter import WinsoundConverter
+
+    log("正在预热 librosa(stft、piptrack、重采样)...")
+    log(f"预热完成，用时 {warm_up():.2f} 秒")
+
+    cache = AnalysisCache()
+
+    job_lock = threading.Lock()
+
+    def converter_factory(**callbacks):
+        return WinsoundConverter(cache=cache, **callbacks)
+
+    def run_job(conn, message):
+        with conn:
+            try:
+                with job_lock:
+                    log(f"开始任务: {message[1]}")
+                    start = time.perf_counter()
+                    handle_job(conn, converter_factory, message)
+                    log(f"任务结束: {message[1]}，用时 {time.perf_counter() - start:.2f} 秒")
+            except (OSError, EOFError):
+                log("客户端已断开")
+
+    authkey = secrets.token_bytes(32)
+    with Listener((host, port), authkey=authkey) as listener:
+        write_info_file(info_file, listener.address, authkey)
+        log(f"常驻分析进程已启动: {listener.address[0]}:{listener.address[1]} (进程号 {os.getpid()})")
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except (OSError, EOFError, AuthenticationError) as e:
+                    # 密钥错误等连接失败不影响后续任务
+                    log(f"拒绝连接: {str(e) or type(e).__name__}")
+                    continue
+                try:
+                    message = conn.recv()
+                except (OSError, EOFError):
+                    conn.close()
+                    continue
+                if message[0] == 'convert':
+                    threading.Thread(target=run_job, args=(conn, message), daemon=True).start()
+                    continue
+                with conn:
+                    try:
+                        if message[0] == 'ping':
+                            conn.send(('pong', os.getpid()))
+                        elif message[0] == 'shutdown':
+                            # 等待正在执行的任务结束后再退出
+                            with job_lock:
+                                conn.send(('bye',))
+                            break
+                    except (OSError, EOFError):
+                        log("客户端已断开")
+        finally:
+            if os.path.exists(info_file):
+                os.remove(info_file)
+    log("常驻分析进程已退出")
+
+
+def connect(info_file=DEFAULT_INFO_FILE):
+    """连接常驻分析进程，未运行时抛出 WorkerUnavailable"""
+    address, authkey = read_info_file(info_file)
+    try:
+        return Client(address, authkey=authkey)
+    except (OSError, EOFError, AuthenticationError) as e:
+        raise WorkerUnavailable("无法连接常驻分析进程") from e
+
+
+def is_running(info_file=DEFAULT_INFO_FILE):
+    """常驻分析进程是否正在运行并能响应"""
+    try:
+        with connect(info_file) as conn:
+            conn.send(('ping',))
+            return conn.poll(PING_TIMEOUT) and conn.recv()[0] == 'pong'
+    except (WorkerUnavailable, OSError, EOFError):
+        return False
+
+
+def submit(mp3_file, output_file=None, function_name=None, options=None, on_log=None, on_progress=None, info_file=DEFAULT_INFO_FILE):
+    """把转换任务交给常驻分析进程，阻塞直到完成，返回与 WinsoundConverter.mp3_to_winsound 相同的结果字典
+
+    路径转换为绝对路径后再发送，常驻进程的工作目录不影响相对路径。
+    结果中的 LOCAL_ONLY_RESULTS 大数组被替换为空值，与流式固定模式的结果形式相同：
+    图形界面不显示波形和频谱，并清除上次的分析结果(修改参数时不会实时重新分段，需要重新转换)。
+    on_log(text) 和 on_progress(event) 在收到对应消息时调用。
+    常驻进程未运行时抛出 WorkerUnavailable，转换出错时抛出 RuntimeError。
+    """
+    mp3_file = os.path.abspath(mp3_file)
+    if output_file is not None:
+        output_file = os.path.abspath(output_file)
+    with connect(info_file) as conn:
+        try:
+            conn.send(('convert', mp3_file, output_file, function_name, options or {}))
+            while True:
+                kind, payload = conn.recv()
+                if kind == 'log':
+                    if on_log is not None:
+                        on_log(payload)
+                elif kind == 'progress':
+                    if on_progress is not None:
+                        on_progress(payload)
+                elif kind == 'result':
+                    return payload
+                elif kind == 'error':
+                    raise RuntimeError(payload)
+        except (OSError, EOFError) as e:
+            raise WorkerUnavailable("与常驻分析进程的连接中断") from e
+
+
+def shutdown(info_file=DEFAULT_INFO_FILE):
+    """请求常驻分析进程退出"""
+    with connect(info_file) as conn:
+        conn.send(('shutdown',))
+        conn.recv()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MP3到Winsound转换器常驻分析进程(预热后接受图形界面和命令行的任务)")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="监听地址(默认只接受本机连接)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="监听端口(默认自动分配)")
+    parser.add_argument("--info-file", default=DEFAULT_INFO_FILE, help="连接信息文件")
+    parser.add_argument("--status", action="store_true", help="只检查常驻进程是否在运行")
+    parser.add_argument("--stop", action="store_true", help="停止正在运行的常驻进程")
+    args = parser.parse_args(argv)
+
+    if args.status:
+        running = is_running(args.info_file)
+        print("常驻分析进程正在运行" if running else "常驻分析进程未运行")
+        return 0 if running else 1
+    if args.stop:
+        try:
+            shutdown(args.info_file)
+        except WorkerUnavailable as e:
+            print(str(e))
+            return 1
+        print("已停止常驻分析进程")
+        return 0
+
+    if is_running(args.info_file):
+        print("常驻分析进程已在运行")
+        return 1
+    try:
+        serve(args.host, args.port, args.info_file)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())